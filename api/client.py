@@ -1,22 +1,59 @@
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple
 import logging
+import threading
+import hashlib
+import copy
+import os
+from urllib.parse import urlsplit, parse_qsl
 from datetime import datetime, timedelta
 from utils.logger import get_logger
+from utils.metrics import metrics, SLOW_BUCKETS
 from config import Config
 import time
 
 logger = get_logger(__name__,file_path="logs/api.log")
 
+DOWNLOAD_SECONDS = metrics.histogram("download_seconds", "Duration of model, label map and gallery downloads", buckets=SLOW_BUCKETS)
+DOWNLOAD_BYTES = metrics.counter("download_bytes_total", "Bytes received by file downloads")
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+
+class RequestRejected(Exception):
+    # the server refused the request itself; sending it again won't change the answer
+    def __init__(self, status: Optional[int], message: str = ""):
+        super().__init__(f"Request rejected ({status}): {message}")
+        self.status = status
+
+
+def _is_rejection(status: Optional[int]) -> bool:
+    return status is not None and 400 <= status < 500 and status not in (401, 408, 429)
+
+
 class APIClient:
     def __init__(self, base_url: str = Config.BASE_URL):
         self.base_url = base_url
         self.access_token = None
         self.token_expiry = None
+        self.session = self._create_session()
+        self._token_lock = threading.Lock()
+        self._conditional_cache: Dict[Tuple, Tuple[Optional[str], Optional[str], Any]] = {}
+        self._cache_lock = threading.Lock()
         
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=Config.HTTP_POOL_SIZE, pool_maxsize=Config.HTTP_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        return session
+
     def _get_token(self) -> bool:
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}{Config.TOKEN_ENDPOINT}",
                 data={
                     "username": Config.API_USERNAME,
@@ -37,12 +74,41 @@ class APIClient:
             logger.error(f"Failed to get access token: {str(e)}")
             return False
             
+    def _token_expired(self) -> bool:
+        return not self.access_token or not self.token_expiry or datetime.now() >= self.token_expiry
+
     def _ensure_valid_token(self) -> bool:
-        if not self.access_token or not self.token_expiry or datetime.now() >= self.token_expiry:
-            return self._get_token()
+        if not self._token_expired():
+            return True
+        # concurrent callers wait for one refresh instead of each fetching a token
+        with self._token_lock:
+            if self._token_expired():
+                return self._get_token()
         return True
+
+    def authenticate(self) -> bool:
+        return self._ensure_valid_token()
             
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.histogram("api_request_seconds", "Latency of API requests", {"method": method}).observe(
+                time.perf_counter() - start
+            )
+            metrics.counter("api_requests_total", "API requests by method and status",
+                            {"method": method, "status": status}).inc()
+
+    def _make_request(self, method: str, endpoint: str, attempts: Optional[int] = None, conditional: bool = False,
+                      raise_rejected: bool = False, **kwargs) -> Optional[Any]:
+        # MAX_RETRIES has always counted attempts, including the first one
+        attempts = Config.MAX_RETRIES if attempts is None else attempts
+        if attempts < 1:
+            raise ValueError(f"attempts must be at least 1: {attempts}")
         try:
             if not self._ensure_valid_token():
                 return None
@@ -56,19 +122,46 @@ class APIClient:
 
             url = f"{self.base_url}{endpoint}"
 
-            for attempt in range(Config.MAX_RETRIES):
+            cache_key, cached = None, None
+            if conditional and method == 'GET':
+                cache_key = (url, tuple(sorted((kwargs.get('params') or {}).items())))
+                with self._cache_lock:
+                    cached = self._conditional_cache.get(cache_key)
+                if cached is not None:
+                    etag, last_modified, _ = cached
+                    if etag:
+                        headers['If-None-Match'] = etag
+                    if last_modified:
+                        headers['If-Modified-Since'] = last_modified
+
+            for attempt in range(attempts):
                 try:
-                    response = requests.request(method, url, **kwargs)
+                    response = self._send(method, url, **kwargs)
 
                     if response.status_code == 401 and self._get_token():
                         kwargs['headers']['Authorization'] = f"Bearer {self.access_token}"
-                        response = requests.request(method, url, **kwargs)
+                        response = self._send(method, url, **kwargs)
+
+                    # callers get their own copy so editing a response can't corrupt the cache
+                    if response.status_code == 304 and cached is not None:
+                        return copy.deepcopy(cached[2])
 
                     response.raise_for_status()
-                    return response.json()
+                    data = response.json()
+
+                    if cache_key is not None:
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        if etag or last_modified:
+                            with self._cache_lock:
+                                self._conditional_cache[cache_key] = (etag, last_modified, copy.deepcopy(data))
+                    return data
 
                 except requests.exceptions.RequestException as e:
-                    if attempt == Config.MAX_RETRIES - 1:
+                    response = getattr(e, 'response', None)
+                    if raise_rejected and response is not None and _is_rejection(response.status_code):
+                        raise RequestRejected(response.status_code, response.text) from e
+                    if attempt == attempts - 1:
                         # Log the error response
                         if hasattr(e, 'response') and e.response is not None:
                             logger.error(f"Error response: {e.response.text}")
@@ -77,74 +170,189 @@ class APIClient:
                     time.sleep(2 ** attempt)
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed after {Config.MAX_RETRIES} attempts: {str(e)}")
+            logger.error(f"API request failed after {attempts} attempts: {str(e)}")
             return None
 
     def get_schedule(self, device_id: str) -> Optional[Dict]:
-        return self._make_request('GET', '/api/Schedule/', params={'device_id': device_id})
+        return self._make_request('GET', '/api/Schedule/', conditional=True, params={'device_id': device_id})
 
     def get_course(self, course_id: str) -> Optional[Dict]:
-        return self._make_request('GET', f'/api/courses/{course_id}/')
+        return self._make_request('GET', f'/api/courses/{course_id}/', conditional=True)
     
-    def get_model_version(self, course_id: str) -> Optional[int]:
-        response = self._make_request('GET', f"/api/FaceModel/", params={"course_id": course_id})
+    def get_model_info(self, course_id: str) -> Optional[Dict]:
+        response = self._make_request('GET', f"/api/FaceModel/", conditional=True, params={"course_id": course_id})
 
         if response and "results" in response and response["results"]:
-            return response["results"][0].get("model_version", None)
+            return response["results"][0]
+
+        return None
+
+    def list_face_models(self) -> Optional[List[Dict]]:
+        face_models = []
+        endpoint, params = '/api/FaceModel/', None
+
+        while endpoint:
+            response = self._make_request('GET', endpoint, conditional=True, params=params)
+            if response is None:
+                return None
+            if isinstance(response, list):
+                return face_models + response
+
+            face_models.extend(response.get("results", []))
+            next_url = response.get("next")
+            if not next_url:
+                break
+
+            parts = urlsplit(next_url)
+            endpoint, params = parts.path, dict(parse_qsl(parts.query))
+
+        return face_models
+
+    def get_model_version(self, course_id: str) -> Optional[int]:
+        info = self.get_model_info(course_id)
+
+        if info is not None:
+            return info.get("model_version", None)
         
         return None  
 
-    def post_attendance(self, attendance_data: Dict) -> Optional[Dict]:
+    def _validate_attendance(self, attendance_data: Dict) -> bool:
         required_fields = ["schedule", "student", "course", "date", "time", "status", "device"]
         for field in required_fields:
             if field not in attendance_data:
                 logger.error(f"Missing required field: {field}")
-                return None
+                return False
+        return True
+
+    def post_attendance(self, attendance_data: Dict, attempts: Optional[int] = None,
+                        raise_rejected: bool = False) -> Optional[Dict]:
+        if not self._validate_attendance(attendance_data):
+            if raise_rejected:
+                raise RequestRejected(None, "missing required fields")
+            return None
+
+        return self._make_request('POST', '/api/attendance/', attempts=attempts,
+                                  raise_rejected=raise_rejected, json=attendance_data)
+
+    def post_attendance_bulk(self, records: List[Dict], attempts: Optional[int] = None) -> Optional[Any]:
+        if not all(self._validate_attendance(record) for record in records):
+            return None
 
-        return self._make_request('POST', '/api/attendance/', json=attendance_data)
+        return self._make_request('POST', '/api/attendance/', attempts=attempts, json=records)
 
-    def download_model(self, course_id: str, save_path: str) -> bool:
+    def _download_file(self, url: str, save_path: str, description: str, checksum: Optional[str] = None) -> bool:
+        part_path = f"{save_path}.part"
+        validator_path = f"{part_path}.validator"
+        start = time.perf_counter()
         try:
             if not self._ensure_valid_token():
                 return False
-                
-            response = requests.get(
-                f"{Config.MODEL_DOWNLOAD_URL}/{course_id}",
-                headers={'Authorization': f"Bearer {self.access_token}"},
-                stream=True,
-                timeout=Config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+
+            # a partial file is only resumed against the ETag/Last-Modified it was started with
+            validator = _read_validator(validator_path)
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) and validator else 0
+            # identity encoding keeps Range offsets aligned with the bytes on disk
+            headers = {'Authorization': f"Bearer {self.access_token}", 'Accept-Encoding': 'identity'}
+            if offset:
+                headers['Range'] = f"bytes={offset}-"
+                headers['If-Range'] = validator
+
+            response = self.session.get(url, headers=headers, stream=True, timeout=Config.REQUEST_TIMEOUT)
+            checksum = checksum or response.headers.get('X-Checksum-SHA256')
+
+            if response.status_code == 416 and offset:
+                if not checksum:
+                    # nothing to prove the partial file is the whole, current file: start over
+                    logger.warning(f"Cannot verify partial {description} download. Restarting it.")
+                    _remove(part_path, validator_path)
+                    return self._download_file(url, save_path, description)
+                logger.info(f"{description} already fully downloaded to {part_path}")
+            else:
+                response.raise_for_status()
+                if response.status_code == 206:
+                    logger.info(f"Resuming {description} download at byte {offset}")
+                else:
+                    # a changed file on the server answers If-Range with the full body
+                    offset = 0
+                    _write_validator(validator_path, response.headers)
+
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    self._stream_to_file(response, f)
+
+                expected_size = response.headers.get('Content-Length')
+                if expected_size is not None and os.path.getsize(part_path) != offset + int(expected_size):
+                    logger.error(f"Incomplete {description} download: expected {offset + int(expected_size)} bytes")
+                    return False
+
+            if checksum and _sha256(part_path) != checksum.lower():
+                logger.error(f"Checksum mismatch for {description}. Discarding download.")
+                _remove(part_path, validator_path)
+                return False
+
+            os.replace(part_path, save_path)
+            _remove(validator_path)
+            DOWNLOAD_SECONDS.observe(time.perf_counter() - start)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to download model: {str(e)}")
+            logger.error(f"Failed to download {description}: {str(e)}")
             return False
+
+    def _stream_to_file(self, response: requests.Response, f) -> None:
+        chunk_size = MIN_CHUNK_SIZE
+        while True:
+            start = time.perf_counter()
+            chunk = response.raw.read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+            DOWNLOAD_BYTES.inc(len(chunk))
+
+            # grow chunks while the link keeps up, shrink them when reads stall
+            elapsed = time.perf_counter() - start
+            if elapsed < 0.05 and chunk_size < MAX_CHUNK_SIZE:
+                chunk_size *= 2
+            elif elapsed > 1.0 and chunk_size > MIN_CHUNK_SIZE:
+                chunk_size //= 2
+
+    def download_model(self, course_id: str, save_path: str, checksum: Optional[str] = None) -> bool:
+        return self._download_file(f"{Config.MODEL_DOWNLOAD_URL}/{course_id}", save_path, "model", checksum)
     
-    def map_model(self, course_id: str, save_path: str) -> bool:
-        try:
-            if not self._ensure_valid_token():
-                return False
-                
-            response = requests.get(
-                f"{Config.MAP_DOWNLOAD_URL}/{course_id}",
-                headers={'Authorization': f"Bearer {self.access_token}"},
-                stream=True,
-                timeout=Config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to download label_map: {str(e)}")
-            return False
\ No newline at end of file
+    def map_model(self, course_id: str, save_path: str, checksum: Optional[str] = None) -> bool:
+        return self._download_file(f"{Config.MAP_DOWNLOAD_URL}/{course_id}", save_path, "label_map", checksum)
+
+    def download_gallery(self, course_id: str, save_path: str, checksum: Optional[str] = None) -> bool:
+        return self._download_file(f"{Config.GALLERY_DOWNLOAD_URL}/{course_id}", save_path, "gallery", checksum)
+
+
+def _read_validator(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_validator(path: str, headers: Dict[str, str]) -> None:
+    # weak ETags can't be used in If-Range, so those downloads simply aren't resumed
+    etag = headers.get('ETag')
+    validator = etag if etag and not etag.startswith('W/') else headers.get('Last-Modified')
+    if validator:
+        with open(path, 'w') as f:
+            f.write(validator)
+    else:
+        _remove(path)
+
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(MAX_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
\ No newline at end of file
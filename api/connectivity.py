@@ -0,0 +1,92 @@
+import socket
+import threading
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+from utils.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__, file_path="logs/api.log")
+
+
+class ConnectivityMonitor:
+    def __init__(
+        self,
+        base_url: str = Config.BASE_URL,
+        interval: float = 30.0,
+        max_backoff: float = 300.0,
+        timeout: float = 3.0,
+    ):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._online: Optional[bool] = None
+        self._listeners: List[Callable[[bool], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, callback: Callable[[bool], None]) -> None:
+        self._listeners.append(callback)
+
+    def probe(self) -> bool:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                return True
+        except OSError:
+            return False
+
+    def check_now(self) -> bool:
+        online = self.probe()
+        self._set_state(online)
+        return online
+
+    def is_online(self) -> bool:
+        if self._online is None:
+            return self.check_now()
+        return self._online
+
+    def mark_offline(self) -> None:
+        self._set_state(False)
+
+    def _set_state(self, online: bool) -> None:
+        with self._lock:
+            changed = self._online is not None and self._online != online
+            self._online = online
+
+        if not changed:
+            return
+
+        logger.info(f"Connectivity changed: {'online' if online else 'offline'} ({self.host}:{self.port})")
+        for callback in self._listeners:
+            try:
+                callback(online)
+            except Exception as e:
+                logger.error(f"Connectivity listener failed: {str(e)}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="connectivity", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        delay = 0.0
+        backoff = min(5.0, self.interval)
+        while not self._stop_event.wait(delay):
+            if self.check_now():
+                backoff = min(5.0, self.interval)
+                delay = self.interval
+            else:
+                delay = backoff
+                backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class StubAPIServer:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload: Any, status: int = 200) -> None:
+                time.sleep(stub.latency)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                stub.calls[f"GET {path}"] += 1
+                self._reply({"results": [], "next": None})
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                stub.calls[f"POST {path}"] += 1
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                if path == "/api/token/":
+                    self._reply({"access": "benchmark-token"})
+                else:
+                    self._reply({"status": "ok"}, status=201)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+
+class StubBackend:
+    name = "stub"
+
+    def __init__(self, num_classes: int, latency: float = 0.0, seed: int = 0):
+        self.num_classes = num_classes
+        self.latency = latency
+        self._rng = np.random.default_rng(seed)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        time.sleep(self.latency)
+        logits = self._rng.normal(size=(batch.shape[0], self.num_classes)).astype(np.float32)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def iter_frames(source: str, max_frames: int) -> Iterator[np.ndarray]:
+    import cv2
+
+    count = 0
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if count >= max_frames:
+                return
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    count += 1
+                    yield frame
+        return
+
+    cap = cv2.VideoCapture(source)
+    try:
+        while count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples) * 1000.0
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def replay_stream(scheduler: Any, context: Any, source: str, max_frames: int,
+                  stages: Dict[str, List[float]], counts: Dict[str, int]) -> None:
+    frames = iter_frames(source, max_frames)
+    while True:
+        t0 = time.perf_counter()
+        frame = next(frames, None)
+        if frame is None:
+            break
+        t1 = time.perf_counter()
+        item = scheduler._track_faces(context, frame)
+        t2 = time.perf_counter()
+        item = scheduler._classify_faces(context, item)
+        t3 = time.perf_counter()
+        scheduler._report_predictions(context, item)
+        t4 = time.perf_counter()
+
+        # list.append is atomic, so streams can share the sample lists
+        stages["capture"].append(t1 - t0)
+        stages["detect"].append(t2 - t1)
+        stages["classify"].append(t3 - t2)
+        stages["report"].append(t4 - t3)
+        stages["frame"].append(t4 - t0)
+        counts[context.name] += 1
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubAPIServer(latency=args.api_latency)
+    stub.start()
+
+    os.environ.update({
+        "BASE_URL": f"http://127.0.0.1:{stub.port}",
+        "CHECK_INTERVAL": "10",
+        "REQUEST_TIMEOUT": "5",
+        "MAX_RETRIES": "1",
+        "HEADLESS": "true",
+        "PREVIEW_PORT": "0",
+        "MOTION_GATING": "false" if args.no_motion_gating else "true",
+    })
+    if args.model:
+        os.environ["INFERENCE_BACKEND"] = args.backend
+
+    source = os.path.abspath(args.source)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="frabench_")
+    os.makedirs(os.path.join(workdir, "logs"), exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    from api.client import APIClient
+    from scheduler.course_scheduler import CourseScheduler
+    from scheduler.model_cache import CachedModel
+    from scheduler.streams import StreamContext
+    from utils.metrics import metrics
+
+    scheduler = CourseScheduler(APIClient(), args.device_id)
+    scheduler.load_vision_stack()
+
+    if args.model:
+        model = scheduler.model_manager.open_model(os.path.abspath(args.model))
+        if model is None:
+            raise SystemExit(f"Cannot load model {args.model}")
+        with open(os.path.abspath(args.label_map)) as f:
+            label_map = json.load(f)
+    else:
+        model = StubBackend(args.num_classes, latency=args.model_latency)
+        label_map = {"0": "unknown", **{str(i): f"student_{i}" for i in range(1, args.num_classes)}}
+
+    entry = CachedModel(model, label_map, 0)
+    contexts = [
+        StreamContext(f"replay_{index}", None, args.schedule_id, args.course_id, "23:59:59", entry, scheduler.new_tracker())
+        for index in range(args.streams)
+    ]
+    for context in contexts:
+        context.gate = scheduler.new_motion_gate()
+    scheduler.inference.start()
+
+    stages = {"capture": [], "detect": [], "classify": [], "report": [], "frame": []}
+    counts = {context.name: 0 for context in contexts}
+    threads = [
+        threading.Thread(target=replay_stream, args=(scheduler, context, source, args.max_frames, stages, counts))
+        for context in contexts
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    processed = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    flush_started = time.perf_counter()
+    scheduler.attendance_processor.flush(args.flush_timeout)
+    flush_elapsed = time.perf_counter() - flush_started
+    stub.stop()
+
+    return {
+        "source": source,
+        "model": os.path.abspath(args.model) if args.model else "stub",
+        "frames": processed,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {name: summarize(samples) for name, samples in stages.items()},
+        "streams": {
+            context.name: {
+                "frames": counts[context.name],
+                "tracker": context.tracker.stats(),
+                "motion_gate": context.gate.stats() if context.gate is not None else None,
+            }
+            for context in contexts
+        },
+        "inference": scheduler.inference.stats(),
+        "attendance": {
+            "checked_students": len(set().union(*(context.checked_students for context in contexts))),
+            "flush_s": round(flush_elapsed, 3),
+            "offline_pending": scheduler.offline_handler.pending_count(),
+        },
+        "api_calls": dict(stub.calls),
+        "metrics": metrics.snapshot(),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the recognition pipeline")
+    parser.add_argument("source", help="Video file or directory of images")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--max_frames", type=int, default=1000)
+    parser.add_argument("--model", help="Real model file; a random stub classifier is used when omitted")
+    parser.add_argument("--label_map", help="Label map JSON for --model")
+    parser.add_argument("--backend", default="keras", help="Inference backend for --model")
+    parser.add_argument("--streams", type=int, default=1, help="Replay the source on this many concurrent streams")
+    parser.add_argument("--num_classes", type=int, default=30, help="Classes produced by the stub model")
+    parser.add_argument("--model_latency", type=float, default=0.0, help="Seconds added per stub inference call")
+    parser.add_argument("--api_latency", type=float, default=0.0, help="Seconds added per stub API response")
+    parser.add_argument("--flush_timeout", type=float, default=30.0)
+    parser.add_argument("--no_motion_gating", action="store_true", help="Run the detector on every frame")
+    parser.add_argument("--device_id", default="benchmark")
+    parser.add_argument("--course_id", type=int, default=1)
+    parser.add_argument("--schedule_id", type=int, default=1)
+    parser.add_argument("--workdir", help="Directory for logs and offline state (temporary by default)")
+    args = parser.parse_args()
+
+    if args.model and not args.label_map:
+        parser.error("--label_map is required with --model")
+
+    output = os.path.abspath(args.output)
+    results = run(args)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ class Config:
     BASE_URL: str = os.getenv('BASE_URL')
     MODEL_DOWNLOAD_URL: str = os.getenv('MODEL_DOWNLOAD_URL')
     MAP_DOWNLOAD_URL: str = os.getenv('MAP_DOWNLOAD_URL')
+    GALLERY_DOWNLOAD_URL: str = os.getenv('GALLERY_DOWNLOAD_URL')
     API_USERNAME: str = os.getenv('API_USERNAME')
     API_PASSWORD: str = os.getenv('API_PASSWORD')
     
@@ -18,14 +19,82 @@ class Config:
     
     # Path Configuration
     MODELS_DIR: str = os.getenv('MODELS_DIR')
+    MANIFEST_MAX_AGE: int = int(os.getenv('MANIFEST_MAX_AGE', '300'))  # seconds before versions are re-checked
     
     # Service Configuration
     CHECK_INTERVAL: int = int(os.getenv('CHECK_INTERVAL'))  # seconds
+    SCHEDULE_REFRESH_INTERVAL: int = int(os.getenv('SCHEDULE_REFRESH_INTERVAL', '300'))  # seconds
     LOG_LEVEL: str = os.getenv('LOG_LEVEL')
     
     # Request Configuration
     REQUEST_TIMEOUT: int = int(os.getenv('REQUEST_TIMEOUT'))  # seconds
     MAX_RETRIES: int = int(os.getenv('MAX_RETRIES'))
+    HTTP_POOL_SIZE: int = int(os.getenv('HTTP_POOL_SIZE', '8'))
+    DOWNLOAD_CONCURRENCY: int = int(os.getenv('DOWNLOAD_CONCURRENCY', '3'))
+    CONNECTIVITY_CHECK_INTERVAL: int = int(os.getenv('CONNECTIVITY_CHECK_INTERVAL', '30'))  # seconds
+    CONNECTIVITY_MAX_BACKOFF: int = int(os.getenv('CONNECTIVITY_MAX_BACKOFF', '300'))  # seconds
+
+    # Offline Sync Configuration
+    SYNC_CHUNK_SIZE: int = int(os.getenv('SYNC_CHUNK_SIZE', '50'))
+    SYNC_WORKERS: int = int(os.getenv('SYNC_WORKERS', '4'))
+    ATTENDANCE_COOLDOWN_SECONDS: float = float(os.getenv('ATTENDANCE_COOLDOWN_SECONDS', '5'))  # per student/course/schedule
+    OUTBOX_FLUSH_TIMEOUT: int = int(os.getenv('OUTBOX_FLUSH_TIMEOUT', '10'))  # seconds
+    ATTENDANCE_BULK_SYNC: bool = os.getenv('ATTENDANCE_BULK_SYNC', 'false').lower() == 'true'
+
+    # Inference Configuration
+    INFERENCE_BACKEND: str = os.getenv('INFERENCE_BACKEND', 'keras')  # keras | tflite
+    TFLITE_QUANTIZATION: str = os.getenv('TFLITE_QUANTIZATION', 'none')  # none | float16 | int8
+    TFLITE_NUM_THREADS: int = int(os.getenv('TFLITE_NUM_THREADS', '4'))
+    RECOGNITION_MODE: str = os.getenv('RECOGNITION_MODE', 'classifier')  # classifier | embedding
+    EMBEDDING_MODEL_PATH: str = os.getenv('EMBEDDING_MODEL_PATH', 'models/face_embedding.keras')
+    EMBEDDING_MATCH_THRESHOLD: float = float(os.getenv('EMBEDDING_MATCH_THRESHOLD', '0.6'))  # cosine similarity
+    MODEL_CACHE_SIZE: int = int(os.getenv('MODEL_CACHE_SIZE', '3'))  # models kept in memory
+    MODEL_CACHE_MAX_MB: int = int(os.getenv('MODEL_CACHE_MAX_MB', '512'))
+    PREFETCH_LEAD_SECONDS: int = int(os.getenv('PREFETCH_LEAD_SECONDS', '300'))
+    PREFETCH_WARMUP_BATCH: int = int(os.getenv('PREFETCH_WARMUP_BATCH', '4'))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))
+
+    # Capture Configuration
+    FRAME_SOURCE: str = os.getenv('FRAME_SOURCE', 'camera')  # camera | network
+    CAMERA_DEVICE: str = os.getenv('CAMERA_DEVICE', '0')  # device index, video file or stream URL
+    FRAME_SOURCE_ADDRESS: str = os.getenv('FRAME_SOURCE_ADDRESS', '127.0.0.1:9999')  # host:port of a frame sender
+    CAMERA_STREAMS: str = os.getenv('CAMERA_STREAMS', '')  # name=source[@schedule_id|...],... empty uses FRAME_SOURCE
+    INFERENCE_MAX_BATCH: int = int(os.getenv('INFERENCE_MAX_BATCH', '16'))  # faces per shared inference batch
+    INFERENCE_BATCH_WAIT_MS: float = float(os.getenv('INFERENCE_BATCH_WAIT_MS', '0'))  # extra wait for other streams' faces
+
+    # Display Configuration
+    HEADLESS: bool = os.getenv('HEADLESS', 'false' if os.getenv('DISPLAY') else 'true').lower() == 'true'
+    PREVIEW_PORT: int = int(os.getenv('PREVIEW_PORT', '0'))  # 0 disables the preview server
+    PREVIEW_FPS: float = float(os.getenv('PREVIEW_FPS', '2'))
+    PREVIEW_HOST: str = os.getenv('PREVIEW_HOST', '127.0.0.1')  # 0.0.0.0 exposes the unauthenticated feed to the LAN
+
+    # Detection Configuration
+    # dlib | haar | yunet | auto. auto benchmarks every available backend at startup against
+    # DETECTOR_SAMPLE_DIR (face images plus an annotations.json of [x1, y1, x2, y2] boxes per file)
+    # and falls back to dlib when that set is missing; yunet also needs YUNET_MODEL_PATH from the
+    # OpenCV model zoo (face_detection_yunet_2023mar.onnx). Neither file ships with the client.
+    DETECTOR_BACKEND: str = os.getenv('DETECTOR_BACKEND', 'dlib')
+    DETECTOR_DOWNSCALE: float = float(os.getenv('DETECTOR_DOWNSCALE', '1.0'))  # detector input scale, 0-1
+    DETECTOR_SAMPLE_DIR: str = os.getenv('DETECTOR_SAMPLE_DIR', 'models/detector_samples')  # images + annotations.json
+    DETECTOR_MIN_RECALL: float = float(os.getenv('DETECTOR_MIN_RECALL', '0.9'))
+    YUNET_MODEL_PATH: str = os.getenv('YUNET_MODEL_PATH', 'models/face_detection_yunet_2023mar.onnx')
+    FACE_ALIGNMENT: bool = os.getenv('FACE_ALIGNMENT', 'false').lower() == 'true'
+
+    # Tracking Configuration
+    TRACKER_DETECT_INTERVAL: int = int(os.getenv('TRACKER_DETECT_INTERVAL', '10'))  # frames
+    TRACKER_CONFIRM_VOTES: int = int(os.getenv('TRACKER_CONFIRM_VOTES', '3'))
+
+    # Motion Gating Configuration
+    MOTION_GATING: bool = os.getenv('MOTION_GATING', 'true').lower() == 'true'
+    MOTION_THRESHOLD: float = float(os.getenv('MOTION_THRESHOLD', '0.01'))  # changed-pixel fraction that wakes the detector
+    MOTION_HOLD_SECONDS: float = float(os.getenv('MOTION_HOLD_SECONDS', '3'))  # stay awake this long after the last motion
+    MOTION_IDLE_FPS: float = float(os.getenv('MOTION_IDLE_FPS', '1'))  # frames still checked while idle, 0 disables
+    MOTION_WIDTH: int = int(os.getenv('MOTION_WIDTH', '160'))  # width of the downscaled comparison frame
+
+    # Metrics Configuration
+    METRICS_PORT: int = int(os.getenv('METRICS_PORT', '0'))  # 0 disables the /metrics endpoint
+    METRICS_SNAPSHOT_PATH: str = os.getenv('METRICS_SNAPSHOT_PATH', 'logs/metrics.json')
+    METRICS_SNAPSHOT_INTERVAL: int = int(os.getenv('METRICS_SNAPSHOT_INTERVAL', '60'))  # seconds, 0 disables
     
     @classmethod
     def as_dict(cls) -> Dict[str, Any]:
@@ -1,10 +1,15 @@
-import schedule
 import time
+
+BOOT_STARTED = time.time()
+
 from api.client import APIClient
 from scheduler.course_scheduler import CourseScheduler
 from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.timing import StartupTimer
 from config import Config
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 logger = get_logger(__name__, file_path="logs/app.log")
 
@@ -13,32 +18,68 @@ class FaceRecognitionService:
         self.api_client = APIClient(Config.BASE_URL)
         self.scheduler = CourseScheduler(self.api_client, device_id)
         
+    def _fetch_schedule(self, timer: StartupTimer):
+        timer.run("auth", self.api_client.authenticate)
+        return timer.run("schedule", self.scheduler.get_all_schedule)
+
+    def _fetch_manifest(self, timer: StartupTimer) -> None:
+        self.api_client.authenticate()
+        timer.run("manifest", self.scheduler.refresh_manifest)
+
+    def _sync_models(self, schedule_data) -> None:
+        if schedule_data is None:
+            logger.error("Failed to fetch schedule data. Using cached timeline and retrying later...")
+            return
+        if "results" not in schedule_data:
+            return
+
+        course_ids = sorted({entry.get("course") for entry in schedule_data["results"] if entry.get("course")})
+        pending = self.scheduler.courses_needing_download(course_ids)
+        logger.info(f"{len(pending)} of {len(course_ids)} course models need downloading")
+
+        with ThreadPoolExecutor(max_workers=Config.DOWNLOAD_CONCURRENCY) as executor:
+            results = dict(zip(pending, executor.map(self.scheduler.sync_course_model, pending)))
+        failed = [course_id for course_id, ok in results.items() if not ok]
+        if failed:
+            logger.error(f"Failed to sync models for courses: {failed}")
+
+    def boot(self) -> None:
+        timer = StartupTimer(BOOT_STARTED)
+
+        # the vision stack (cv2/dlib/TF imports) loads while the network phases run
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            vision = executor.submit(timer.run, "vision_stack", self.scheduler.load_vision_stack)
+            executor.submit(timer.run, "connectivity", self.scheduler.connectivity.check_now)
+            manifest = executor.submit(self._fetch_manifest, timer)
+            schedule_data = self._fetch_schedule(timer)
+
+            manifest.result()
+            timer.run("model_sync", self._sync_models, schedule_data)
+            vision.result()
+
+        report = timer.save("logs/startup.json")
+        phases = ", ".join(f"{name} {phase['duration_s']:.2f}s" for name, phase in report["phases"].items())
+        logger.info(f"Ready in {report['ready_s']:.2f}s ({phases})")
+
     def start(self) -> None:
         logger.info("Starting Face Recognition Service...")
 
-        schedule_data = self.scheduler.get_all_schedule()
+        self.boot()
 
-        if schedule_data is None:
-            logger.error("Failed to fetch schedule data. Retrying later...")
-        elif "results" in schedule_data:
-            for entry in schedule_data["results"]:
-                course_id = entry.get("course") 
-                if course_id and self.scheduler.check_model_update(course_id):
-                    model_success = self.api_client.download_model(str(course_id), f"course_models/model_{course_id}.keras")
-                    label_success = self.api_client.map_model(str(course_id), f"course_models/label_map_{course_id}.json")
-
-                    if model_success and label_success:
-                        with open(f"course_models/model_{course_id}.version", "w") as f:
-                            f.write(str(self.api_client.get_model_version(str(course_id))))
-                    else:
-                        logger.error(f"Failed to download model or label map for course {course_id}")
-
-        schedule.every(Config.CHECK_INTERVAL).seconds.do(self.scheduler.check_and_update_model)
+        self.scheduler.connectivity.start()
+        if self.scheduler.preview is not None:
+            self.scheduler.preview.start()
+        if Config.METRICS_PORT:
+            metrics.start_server(Config.METRICS_PORT)
+        if Config.METRICS_SNAPSHOT_INTERVAL > 0:
+            metrics.start_snapshots(Config.METRICS_SNAPSHOT_PATH, Config.METRICS_SNAPSHOT_INTERVAL)
+        self.scheduler.start_prefetcher()
+        self.scheduler.start_schedule_refresher()
 
         while True:
             try:
-                schedule.run_pending()
-                time.sleep(1)
+                self.scheduler.check_and_update_model()
+                self.scheduler.wait_for_next_event()
             except Exception as e:
                 logger.error(f"Error in main loop: {str(e)}")
                 time.sleep(Config.CHECK_INTERVAL)
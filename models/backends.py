@@ -0,0 +1,167 @@
+import os
+from typing import Optional
+import numpy as np
+
+from utils.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__, file_path="logs/model.log")
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+
+def _normalized_function(model):
+    import tensorflow as tf
+
+    # takes uint8 pixels; the /255 runs inside the graph instead of on a host float copy
+    @tf.function(input_signature=[tf.TensorSpec([None] + list(model.input_shape[1:]), tf.uint8)])
+    def predict(batch):
+        return model(tf.cast(batch, tf.float32) * (1.0 / 255.0), training=False)
+
+    return predict
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self):
+        self.model = None
+        self._predict = None
+
+    def load(self, model_path: str) -> bool:
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path)
+        self._predict = _normalized_function(self.model)
+        return True
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._predict(batch).numpy()
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, quantization: str = "none", num_threads: int = 4):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported TFLite quantization: {quantization}")
+
+        self.quantization = quantization
+        self.num_threads = num_threads
+        self.interpreter = None
+        self._input = None
+        self._output = None
+        self._batch_size = None
+        self._float_batch = None
+
+    def tflite_path(self, model_path: str) -> str:
+        root, _ = os.path.splitext(model_path)
+        suffix = "" if self.quantization == "none" else f".{self.quantization}"
+        # .u8 marks conversions with uint8 input and normalization built in
+        return f"{root}{suffix}.u8.tflite"
+
+    def load(self, model_path: str) -> bool:
+        if model_path.endswith(".tflite"):
+            tflite_path = model_path
+        else:
+            tflite_path = self.tflite_path(model_path)
+            if not is_conversion_current(model_path, tflite_path):
+                convert_to_tflite(model_path, tflite_path, self.quantization)
+
+        self.interpreter = _create_interpreter(tflite_path, self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._refresh_details()
+        return True
+
+    def _refresh_details(self) -> None:
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        if batch.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input['index'], list(batch.shape), strict=False)
+            self.interpreter.allocate_tensors()
+            self._refresh_details()
+
+        self.interpreter.set_tensor(self._input['index'], self._prepare_input(batch))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output['index'])
+
+        if output.dtype != np.float32:
+            scale, zero_point = self._output['quantization']
+            output = (output.astype(np.float32) - zero_point) * scale
+
+        return output
+
+
+    def _prepare_input(self, batch: np.ndarray) -> np.ndarray:
+        input_dtype = self._input['dtype']
+        scale, zero_point = self._input['quantization']
+
+        # raw pixels fit as-is when the graph normalizes (no quantization) or when the
+        # input is quantized with scale 1/255, which makes the pixels the quantized values
+        if input_dtype == np.uint8 and (scale == 0.0 or (zero_point == 0 and abs(scale * 255.0 - 1.0) < 1e-6)):
+            return batch
+
+        # float-input models converted elsewhere still need the host-side /255
+        if self._float_batch is None or self._float_batch.shape != batch.shape:
+            self._float_batch = np.empty(batch.shape, dtype=np.float32)
+        np.multiply(batch, np.float32(1.0 / 255.0), out=self._float_batch)
+        if input_dtype == np.float32:
+            return self._float_batch
+        return np.round(self._float_batch / scale + zero_point).astype(input_dtype)
+
+
+def _create_interpreter(tflite_path: str, num_threads: int):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+
+        return Interpreter(model_path=tflite_path, num_threads=num_threads)
+    except ImportError:
+        pass
+
+    import tensorflow as tf
+
+    logger.warning("tflite_runtime not available, falling back to tf.lite.Interpreter")
+    return tf.lite.Interpreter(model_path=tflite_path, num_threads=num_threads)
+
+
+def is_conversion_current(model_path: str, tflite_path: str) -> bool:
+    if not os.path.exists(tflite_path):
+        return False
+    return os.path.getmtime(tflite_path) >= os.path.getmtime(model_path)
+
+
+def convert_to_tflite(model_path: str, tflite_path: str, quantization: str = "none") -> None:
+    import tensorflow as tf
+
+    logger.info(f"Converting {model_path} to TFLite (quantization: {quantization})")
+    model = tf.keras.models.load_model(model_path)
+    predict = _normalized_function(model)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([predict.get_concrete_function()], model)
+
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        # Dynamic-range quantization: int8 weights, float I/O. Full integer
+        # quantization would need a representative dataset we don't have on device.
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    tflite_model = converter.convert()
+
+    tmp_path = f"{tflite_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, tflite_path)
+    logger.info(f"Saved TFLite model to {tflite_path}")
+
+
+def create_backend(name: Optional[str] = None):
+    name = name or Config.INFERENCE_BACKEND
+    if name == "keras":
+        return KerasBackend()
+    if name == "tflite":
+        return TFLiteBackend(Config.TFLITE_QUANTIZATION, Config.TFLITE_NUM_THREADS)
+    raise ValueError(f"Unknown inference backend: {name}")
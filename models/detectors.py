@@ -0,0 +1,202 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from utils.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__, file_path="logs/model.log")
+
+Box = Tuple[int, int, int, int]
+
+DETECTOR_BACKENDS = ("haar", "dlib", "yunet")
+
+
+class BaseDetector:
+    name = "base"
+
+    def __init__(self, downscale: float = 1.0):
+        if not 0.0 < downscale <= 1.0:
+            raise ValueError(f"Detector downscale must be in (0, 1]: {downscale}")
+        self.downscale = downscale
+        self._small: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+
+    def _scaled(self, frame: np.ndarray) -> np.ndarray:
+        if self.downscale >= 1.0:
+            return frame
+        height, width = frame.shape[:2]
+        shape = (max(1, int(height * self.downscale)), max(1, int(width * self.downscale))) + frame.shape[2:]
+        if self._small is None or self._small.shape != shape:
+            self._small = np.empty(shape, dtype=frame.dtype)
+        return cv2.resize(frame, (shape[1], shape[0]), dst=self._small, interpolation=cv2.INTER_AREA)
+
+    def _grayscale(self, image: np.ndarray) -> np.ndarray:
+        if image.ndim == 2:
+            return image
+        if self._gray is None or self._gray.shape != image.shape[:2]:
+            self._gray = np.empty(image.shape[:2], dtype=np.uint8)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        raise NotImplementedError
+
+    def detect(self, frame: np.ndarray) -> List[Box]:
+        boxes = self._detect(self._scaled(frame))
+        if self.downscale >= 1.0:
+            return boxes
+        scale = 1.0 / self.downscale
+        return [(int(x1 * scale), int(y1 * scale), int(x2 * scale), int(y2 * scale)) for x1, y1, x2, y2 in boxes]
+
+
+class HaarDetector(BaseDetector):
+    name = "haar"
+
+    def __init__(self, downscale: float = 1.0, scale_factor: float = 1.1, min_neighbors: int = 4):
+        super().__init__(downscale)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self._cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        if self._cascade.empty():
+            raise RuntimeError("Haar cascade could not be loaded")
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        faces = self._cascade.detectMultiScale(self._grayscale(image), self.scale_factor, self.min_neighbors)
+        return [(int(x), int(y), int(x + w), int(y + h)) for x, y, w, h in faces]
+
+
+class DlibHOGDetector(BaseDetector):
+    name = "dlib"
+
+    def __init__(self, downscale: float = 1.0, upsample: int = 0):
+        import dlib
+
+        super().__init__(downscale)
+        self.upsample = upsample
+        self._detector = dlib.get_frontal_face_detector()
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        faces = self._detector(self._grayscale(image), self.upsample)
+        return [(face.left(), face.top(), face.right(), face.bottom()) for face in faces]
+
+
+class YuNetDetector(BaseDetector):
+    name = "yunet"
+
+    def __init__(self, model_path: str, downscale: float = 1.0, score_threshold: float = 0.6):
+        super().__init__(downscale)
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError("cv2.FaceDetectorYN requires OpenCV 4.5.4 or newer")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model file {model_path} not found")
+        self._detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+        self._input_size: Optional[Tuple[int, int]] = None
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        size = (image.shape[1], image.shape[0])
+        if size != self._input_size:
+            self._detector.setInputSize(size)
+            self._input_size = size
+
+        _, faces = self._detector.detect(image)
+        if faces is None:
+            return []
+        return [(int(x), int(y), int(x + w), int(y + h)) for x, y, w, h in faces[:, :4]]
+
+
+def create_detector(name: str, downscale: Optional[float] = None) -> BaseDetector:
+    downscale = Config.DETECTOR_DOWNSCALE if downscale is None else downscale
+    if name == "haar":
+        return HaarDetector(downscale)
+    if name == "dlib":
+        return DlibHOGDetector(downscale)
+    if name == "yunet":
+        return YuNetDetector(Config.YUNET_MODEL_PATH, downscale)
+    raise ValueError(f"Unknown detector backend: {name}")
+
+
+def _load_samples(sample_dir: str) -> List[Tuple[np.ndarray, List[Box]]]:
+    # annotations.json maps image file names to lists of [x1, y1, x2, y2] face boxes
+    with open(os.path.join(sample_dir, "annotations.json"), "r") as f:
+        annotations = json.load(f)
+
+    samples = []
+    for file_name, boxes in annotations.items():
+        image = cv2.imread(os.path.join(sample_dir, file_name))
+        if image is None:
+            logger.warning(f"Skipping unreadable detector sample {file_name}")
+            continue
+        samples.append((image, [tuple(box) for box in boxes]))
+    return samples
+
+
+def _recall(expected: List[Box], detected: List[Box], iou_threshold: float = 0.5) -> Tuple[int, int]:
+    if not expected:
+        return 0, 0
+    if not detected:
+        return 0, len(expected)
+
+    from .tracker import iou_matrix
+
+    matched = int((iou_matrix(expected, detected).max(axis=1) >= iou_threshold).sum())
+    return matched, len(expected)
+
+
+def benchmark_detectors(sample_dir: str, candidates: Sequence[str] = DETECTOR_BACKENDS,
+                        downscale: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    samples = _load_samples(sample_dir)
+    results = {}
+
+    for name in candidates:
+        try:
+            detector = create_detector(name, downscale)
+        except Exception as e:
+            logger.info(f"Detector {name} unavailable: {str(e)}")
+            continue
+
+        detector.detect(samples[0][0])  # first call pays for lazy initialization
+        matched, total, elapsed = 0, 0, 0.0
+        for image, expected in samples:
+            start = time.perf_counter()
+            detected = detector.detect(image)
+            elapsed += time.perf_counter() - start
+            hits, count = _recall(expected, detected)
+            matched += hits
+            total += count
+
+        results[name] = {
+            "recall": round(matched / total, 3) if total else 1.0,
+            "mean_ms": round(elapsed * 1000.0 / len(samples), 2),
+        }
+    return results
+
+
+def select_detector(sample_dir: str, min_recall: float, fallback: str = "dlib") -> str:
+    if not os.path.exists(os.path.join(sample_dir, "annotations.json")):
+        logger.info(f"No detector samples in {sample_dir}. Using {fallback} detector.")
+        return fallback
+
+    try:
+        results = benchmark_detectors(sample_dir)
+    except Exception as e:
+        logger.error(f"Detector benchmark failed: {str(e)}. Using {fallback} detector.")
+        return fallback
+    if not results:
+        return fallback
+
+    summary = ", ".join(f"{name} {r['mean_ms']}ms recall {r['recall']}" for name, r in results.items())
+    eligible = [name for name, r in results.items() if r["recall"] >= min_recall]
+    if eligible:
+        selected = min(eligible, key=lambda name: results[name]["mean_ms"])
+    else:
+        selected = max(results, key=lambda name: (results[name]["recall"], -results[name]["mean_ms"]))
+        logger.warning(f"No detector reached recall {min_recall}; using the most accurate one")
+
+    logger.info(f"Selected {selected} detector ({summary})")
+    return selected
@@ -0,0 +1,42 @@
+from typing import Optional, Tuple
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/model.log")
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingGallery:
+    def __init__(self, embeddings: np.ndarray, threshold: float = 0.6):
+        self.embeddings = np.ascontiguousarray(l2_normalize(embeddings))
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, gallery_path: str, threshold: float = 0.6) -> Optional["EmbeddingGallery"]:
+        try:
+            embeddings = np.load(gallery_path, allow_pickle=False)
+        except Exception as e:
+            logger.error(f"Error loading gallery {gallery_path}: {str(e)}")
+            return None
+
+        if embeddings.ndim != 2 or embeddings.shape[0] == 0:
+            logger.error(f"Invalid gallery shape {embeddings.shape} in {gallery_path}")
+            return None
+
+        logger.info(f"Loaded gallery of {embeddings.shape[0]} embeddings from {gallery_path}")
+        return cls(embeddings, threshold)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def match(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        similarities = l2_normalize(embeddings) @ self.embeddings.T
+        indices = np.argmax(similarities, axis=1)
+        scores = similarities[np.arange(len(indices)), indices]
+        return np.where(scores >= self.threshold, indices, -1), scores
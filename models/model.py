@@ -1,55 +1,228 @@
-import tensorflow as tf
 from utils.logger import get_logger
-from typing import Optional, Any
+from utils.metrics import metrics, SLOW_BUCKETS
+from .backends import create_backend
+from .detectors import create_detector, select_detector
+from config import Config
+from typing import Optional, Any, Dict, List, Tuple, Union
 import numpy as np
 
 import cv2
 import dlib
 import os
+import threading
+import time
 
 logger = get_logger(__name__,file_path="logs/model.log")
 
+DETECT_SECONDS = metrics.histogram("detect_seconds", "Face detection latency per frame")
+FACES_DETECTED = metrics.counter("faces_detected_total", "Faces returned by the detector")
+INFERENCE_SECONDS = metrics.histogram("inference_seconds", "Model inference latency per batch")
+FACES_CLASSIFIED = metrics.counter("faces_classified_total", "Face crops passed through the model")
+MODEL_LOAD_SECONDS = metrics.histogram("model_load_seconds", "Time to open a model file", buckets=SLOW_BUCKETS)
+
 class FaceRecognitionModel:
-    def __init__(self):
+    def __init__(
+        self,
+        input_size: Tuple[int, int] = (224, 224),
+        detector_backend: Optional[str] = None,
+        align: Optional[bool] = None,
+    ):
         self.model = None
-        self.detector = dlib.get_frontal_face_detector()
+        self.input_size = input_size
+        # crops stay uint8 end to end; backends fold the /255 into the model
+        self._batch = np.empty((0, input_size[1], input_size[0], 3), dtype=np.uint8)
+        self.last_stats: Dict[str, float] = {}
+        self._local = threading.local()
         self.landmark_path = 'models/shape_predictor_68_face_landmarks.dat'
+        self._predictor = None
+        self._predictor_checked = False
+        self._predictor_lock = threading.Lock()
+        self.align = Config.FACE_ALIGNMENT if align is None else align
 
-        if os.path.exists(self.landmark_path):
-            self.predictor = dlib.shape_predictor(self.landmark_path)
-        else:
-            logger.error(f"Landmark model file {self.landmark_path} not found.")
+        name = detector_backend or Config.DETECTOR_BACKEND
+        if name == "auto":
+            name = select_detector(Config.DETECTOR_SAMPLE_DIR, Config.DETECTOR_MIN_RECALL)
+        try:
+            self._local.detector = create_detector(name)
+        except Exception as e:
+            logger.error(f"Cannot create {name} detector: {str(e)}. Falling back to dlib.")
+            name = "dlib"
+        self.detector_backend = name
+
+    @property
+    def detector(self) -> Any:
+        # one detector per stream thread; detectors keep per-call scratch buffers
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = create_detector(self.detector_backend)
+        return detector
 
-    def load_model(self, model_path: str) -> Optional[tf.keras.Model]:
+    @property
+    def predictor(self) -> Optional[Any]:
+        # the ~100 MB landmark model is only read when alignment first needs it
+        with self._predictor_lock:
+            if not self._predictor_checked:
+                self._predictor_checked = True
+                if os.path.exists(self.landmark_path):
+                    self._predictor = dlib.shape_predictor(self.landmark_path)
+                else:
+                    logger.error(f"Landmark model file {self.landmark_path} not found. Face alignment disabled.")
+        return self._predictor
+
+    def open_model(self, model_path: str, backend_name: Optional[str] = None) -> Optional[Any]:
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            logger.info(f"Successfully loaded model from {model_path}")
-            return self.model
+            start = time.perf_counter()
+            backend = create_backend(backend_name)
+            backend.load(model_path)
+            MODEL_LOAD_SECONDS.observe(time.perf_counter() - start)
+            logger.info(f"Successfully loaded model from {model_path} ({backend.name} backend)")
+            return backend
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             return None
 
+    def use_model(self, model: Any) -> None:
+        self.model = model
+
+    def load_model(self, model_path: str, backend_name: Optional[str] = None) -> Optional[Any]:
+        model = self.open_model(model_path, backend_name)
+        if model is not None:
+            self.use_model(model)
+        return model
+
+    def warm_up(self, model: Any, batch_size: int = 1) -> float:
+        start = time.perf_counter()
+        model.predict(np.zeros((batch_size, self.input_size[1], self.input_size[0], 3), dtype=np.uint8))
+        return (time.perf_counter() - start) * 1000.0
+
+    def _gray(self, frame) -> np.ndarray:
+        gray = getattr(self._local, "gray", None)
+        if gray is None or gray.shape != frame.shape[:2]:
+            gray = self._local.gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+
+    def detect(self, frame) -> List[Tuple[int, int, int, int]]:
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        boxes = []
+
+        for x1, y1, x2, y2 in self.detector.detect(frame):
+            # detector boxes can extend past the frame edges
+            box = (max(0, x1), max(0, y1), min(width, x2), min(height, y2))
+            if box[2] > box[0] and box[3] > box[1]:
+                boxes.append(box)
+
+        DETECT_SECONDS.observe(time.perf_counter() - start)
+        FACES_DETECTED.inc(len(boxes))
+        return boxes
+
+    def crop_faces(self, frame, boxes: List[Tuple[int, int, int, int]], out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            # owned by the caller: crops cross into the inference thread and must not be
+            # rewritten by this thread's next frame while they are still being classified
+            out = np.empty((len(boxes),) + self._batch.shape[1:], dtype=np.uint8)
+        height, width = frame.shape[:2]
+        # landmarks are only computed for the faces about to be classified, and only when aligning
+        gray = self._gray(frame) if boxes and self.align and self.predictor is not None else None
+
+        for slot, (x1, y1, x2, y2) in zip(out, boxes):
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+            if x2 <= x1 or y2 <= y1:
+                slot.fill(0)
+            elif gray is not None:
+                self._align_face(frame, gray, (x1, y1, x2, y2), slot)
+            else:
+                cv2.resize(frame[y1:y2, x1:x2], self.input_size, dst=slot)
+        return out
+
+    def _align_face(self, frame, gray: np.ndarray, box: Tuple[int, int, int, int], slot: np.ndarray) -> None:
+        x1, y1, x2, y2 = box
+        shape = self.predictor(gray, dlib.rectangle(x1, y1, x2, y2))
+        eyes = np.array([(shape.part(i).x, shape.part(i).y) for i in range(36, 48)], dtype=np.float32)
+        left_eye, right_eye = eyes[:6].mean(axis=0), eyes[6:].mean(axis=0)
+
+        # rotate about the box centre so the eyes are level, scaling the box onto the model input
+        angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
+        center = ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
+        matrix = cv2.getRotationMatrix2D(center, float(angle), self.input_size[0] / float(x2 - x1))
+        matrix[0, 2] += self.input_size[0] / 2.0 - center[0]
+        matrix[1, 2] += self.input_size[1] / 2.0 - center[1]
+        cv2.warpAffine(frame, matrix, self.input_size, dst=slot, borderMode=cv2.BORDER_REPLICATE)
+
     def preprocess(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.detector(gray, 0)
-        face_images = []
-
-        for face in faces:
-            shape = self.predictor(gray, face) if hasattr(self, 'predictor') else None
-            x1, y1, x2, y2 = face.left(), face.top(), face.right(), face.bottom()
-            face_img = frame[y1:y2, x1:x2]
-            face_img = cv2.resize(face_img, (224, 224))
-            face_img = face_img.astype('float32') / 255.0
-            face_img = np.expand_dims(face_img, axis=0)
-            face_images.append(face_img)
-
-        return frame, face_images if face_images else None
-
-    def predict(self, frame: Any) -> Any:
+        face_images = self.crop_faces(frame, self.detect(frame))
+        return frame, face_images if len(face_images) else None
+
+    def _ensure_batch(self, size: int) -> np.ndarray:
+        if self._batch.shape[0] < size:
+            self._batch = np.empty((size,) + self._batch.shape[1:], dtype=np.uint8)
+        return self._batch[:size]
+
+    def predict_faces(self, face_images: Union[np.ndarray, List[np.ndarray]], model: Optional[Any] = None) -> np.ndarray:
+        if isinstance(face_images, np.ndarray):
+            batch = face_images
+        else:
+            batch = self._ensure_batch(len(face_images))
+            for slot, face_img in zip(batch, face_images):
+                slot[...] = face_img
+
+        start = time.perf_counter()
+        predictions = (model if model is not None else self.model).predict(batch)
+        elapsed = time.perf_counter() - start
+        INFERENCE_SECONDS.observe(elapsed)
+        FACES_CLASSIFIED.inc(len(batch))
+
+        self.last_stats = {
+            "faces": len(batch),
+            "inference_ms": elapsed * 1000.0,
+            "per_face_ms": elapsed * 1000.0 / len(batch),
+        }
+        return predictions
+
+    def predict(self, frame: Any) -> Tuple[Any, Optional[np.ndarray]]:
         if self.model is None:
             logger.error("Model not loaded")
             return frame, None
 
+        start = time.perf_counter()
         frame, face_images = self.preprocess(frame)
-        predictions = [self.model.predict(face, verbose=0) for face in face_images] if face_images else None
-        return frame, predictions
\ No newline at end of file
+        preprocess_ms = (time.perf_counter() - start) * 1000.0
+
+        if face_images is None:
+            self.last_stats = {"faces": 0, "preprocess_ms": preprocess_ms, "inference_ms": 0.0}
+            return frame, None
+
+        predictions = self.predict_faces(face_images)
+        self.last_stats["preprocess_ms"] = preprocess_ms
+        return frame, predictions
+
+    def predict_frames(self, frames: List[Any]) -> List[Tuple[Any, Optional[np.ndarray]]]:
+        if self.model is None:
+            logger.error("Model not loaded")
+            return [(frame, None) for frame in frames]
+
+        start = time.perf_counter()
+        boxes = [self.detect(frame) for frame in frames]
+        counts = [len(frame_boxes) for frame_boxes in boxes]
+
+        # every frame's faces are resized straight into one shared batch
+        batch = self._ensure_batch(sum(counts))
+        offset = 0
+        for frame, frame_boxes in zip(frames, boxes):
+            self.crop_faces(frame, frame_boxes, out=batch[offset:offset + len(frame_boxes)])
+            offset += len(frame_boxes)
+        preprocess_ms = (time.perf_counter() - start) * 1000.0
+
+        if not len(batch):
+            self.last_stats = {"faces": 0, "frames": len(frames), "preprocess_ms": preprocess_ms, "inference_ms": 0.0}
+            return [(frame, None) for frame in frames]
+
+        predictions = self.predict_faces(batch)
+        self.last_stats["frames"] = len(frames)
+        self.last_stats["preprocess_ms"] = preprocess_ms
+
+        results, offset = [], 0
+        for frame, count in zip(frames, counts):
+            results.append((frame, predictions[offset:offset + count] if count else None))
+            offset += count
+        return results
@@ -0,0 +1,92 @@
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    # Compares each frame with the previous one on a small blurred grayscale copy
+    # and only lets frames through to the detector while the scene is changing.
+    def __init__(
+        self,
+        width: int = 160,
+        threshold: float = 0.01,
+        hold_seconds: float = 3.0,
+        idle_fps: float = 1.0,
+        pixel_delta: int = 25,
+    ):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Motion threshold must be in (0, 1]: {threshold}")
+        self.width = width
+        self.threshold = threshold
+        self.hold_seconds = hold_seconds
+        self.idle_interval = 1.0 / idle_fps if idle_fps > 0 else None
+        self.pixel_delta = pixel_delta
+        self.frames = 0
+        self.skipped = 0
+        self.wakeups = 0
+        self.motion_ratio = 0.0
+        self._active_until = 0.0
+        self._last_processed = 0.0
+        self._small: Optional[np.ndarray] = None
+        self._current: Optional[np.ndarray] = None
+        self._previous: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+
+    def _shape(self, frame: np.ndarray) -> Tuple[int, int]:
+        height, width = frame.shape[:2]
+        return max(1, int(height * self.width / width)), self.width
+
+    def _motion(self, frame: np.ndarray) -> float:
+        shape = self._shape(frame)
+        if self._small is None or self._small.shape != shape + frame.shape[2:]:
+            self._small = np.empty(shape + frame.shape[2:], dtype=np.uint8)
+            self._current = np.empty(shape, dtype=np.uint8)
+            self._previous = None
+            self._diff = np.empty(shape, dtype=np.uint8)
+
+        cv2.resize(frame, (shape[1], shape[0]), dst=self._small, interpolation=cv2.INTER_AREA)
+        if self._small.ndim == 3:
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._current)
+        else:
+            self._current[...] = self._small
+        cv2.GaussianBlur(self._current, (5, 5), 0, dst=self._current)
+
+        if self._previous is None:
+            self._previous = self._current.copy()
+            return 1.0
+
+        cv2.absdiff(self._current, self._previous, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self._diff)
+        # this frame becomes the reference; the old reference is overwritten next time
+        self._previous, self._current = self._current, self._previous
+        return cv2.countNonZero(self._diff) / float(self._diff.size)
+
+    def should_process(self, frame: np.ndarray, busy: bool = False) -> bool:
+        now = time.monotonic()
+        self.frames += 1
+        self.motion_ratio = self._motion(frame)
+
+        moving = self.motion_ratio >= self.threshold
+        if moving:
+            if now >= self._active_until:
+                self.wakeups += 1
+            # stays awake for the hold window, so someone pausing in front of the camera is still seen
+            self._active_until = now + self.hold_seconds
+
+        idle_due = self.idle_interval is not None and now - self._last_processed >= self.idle_interval
+        if moving or busy or now < self._active_until or idle_due:
+            self._last_processed = now
+            return True
+
+        self.skipped += 1
+        return False
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "wakeups": self.wakeups,
+            "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+        }
@@ -0,0 +1,158 @@
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import dlib
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/model.log")
+
+Box = Tuple[int, int, int, int]
+
+
+def iou_matrix(boxes_a: List[Box], boxes_b: List[Box]) -> np.ndarray:
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    def __init__(self, track_id: int, frame: Any, box: Box):
+        self.track_id = track_id
+        self.box = box
+        self.label: Optional[str] = None
+        self.confirmed = False
+        self.misses = 0
+        self.lost = False
+        self.votes: Counter = Counter()
+        self._correlation = dlib.correlation_tracker()
+        self.restart(frame, box)
+
+    def restart(self, frame: Any, box: Box) -> None:
+        self.box = box
+        self.lost = False
+        self._correlation.start_track(frame, dlib.rectangle(*box))
+
+    def follow(self, frame: Any, min_quality: float) -> None:
+        quality = self._correlation.update(frame)
+        pos = self._correlation.get_position()
+        height, width = frame.shape[:2]
+        self.box = (
+            max(0, int(pos.left())),
+            max(0, int(pos.top())),
+            min(width, int(pos.right())),
+            min(height, int(pos.bottom())),
+        )
+        self.lost = quality < min_quality or self.box[2] <= self.box[0] or self.box[3] <= self.box[1]
+
+
+class FaceTracker:
+    def __init__(
+        self,
+        detect_interval: int = 10,
+        iou_threshold: float = 0.3,
+        confirm_votes: int = 3,
+        max_misses: int = 2,
+        min_quality: float = 7.0,
+    ):
+        self.detect_interval = detect_interval
+        self.iou_threshold = iou_threshold
+        self.confirm_votes = confirm_votes
+        self.max_misses = max_misses
+        self.min_quality = min_quality
+        self.tracks: Dict[int, Track] = {}
+        self.frame_index = 0
+        self.detections_run = 0
+        self.classifications_requested = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.tracks.clear()
+            self.frame_index = 0
+
+    def update(self, frame: Any, detect: Callable[[Any], List[Box]]) -> List[Track]:
+        with self._lock:
+            self.frame_index += 1
+
+            for track in self.tracks.values():
+                track.follow(frame, self.min_quality)
+
+            run_detection = (
+                not self.tracks
+                or self.frame_index % self.detect_interval == 0
+                or any(track.lost for track in self.tracks.values())
+            )
+            if run_detection:
+                self.detections_run += 1
+                self._associate(frame, detect(frame))
+
+            return list(self.tracks.values())
+
+    def _associate(self, frame: Any, boxes: List[Box]) -> None:
+        tracks = list(self.tracks.values())
+        matched_tracks, matched_boxes = set(), set()
+
+        if tracks and boxes:
+            ious = iou_matrix([track.box for track in tracks], boxes)
+            for flat_index in np.argsort(ious, axis=None)[::-1]:
+                t, b = np.unravel_index(flat_index, ious.shape)
+                if ious[t, b] < self.iou_threshold:
+                    break
+                if t in matched_tracks or b in matched_boxes:
+                    continue
+                tracks[t].restart(frame, boxes[b])
+                tracks[t].misses = 0
+                matched_tracks.add(t)
+                matched_boxes.add(b)
+
+        for t, track in enumerate(tracks):
+            if t in matched_tracks:
+                continue
+            track.misses += 1
+            if track.lost or track.misses > self.max_misses:
+                del self.tracks[track.track_id]
+
+        for b, box in enumerate(boxes):
+            if b not in matched_boxes:
+                self.tracks[self._next_id] = Track(self._next_id, frame, box)
+                self._next_id += 1
+
+    def unconfirmed(self, tracks: List[Track]) -> List[Track]:
+        pending = [track for track in tracks if not track.confirmed]
+        self.classifications_requested += len(pending)
+        return pending
+
+    def resolve(self, track_id: int, label: str) -> Optional[str]:
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is None or track.confirmed:
+                return None
+
+            track.votes[label] += 1
+            track.label, count = track.votes.most_common(1)[0]
+            if count >= self.confirm_votes:
+                track.confirmed = True
+                return track.label
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames": self.frame_index,
+            "detections_run": self.detections_run,
+            "classifications_requested": self.classifications_requested,
+            "active_tracks": len(self.tracks),
+        }
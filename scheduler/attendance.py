@@ -1,99 +1,343 @@
-import requests
 import json
+import glob
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
-from time import time
+from typing import List, Dict, Any, Optional, Tuple
+from time import time, sleep
 import os
 
+from api.client import RequestRejected
+from api.connectivity import ConnectivityMonitor
 from utils.logger import get_logger
+from utils.metrics import metrics
 
 logger = get_logger(__name__, file_path="logs/attendance.log")
 
+POST_SECONDS = metrics.histogram("attendance_post_seconds", "Latency of a single attendance POST attempt")
+OFFLINE_SYNCED = metrics.counter("offline_synced_total", "Offline attendance records uploaded by sync")
+
 
 class OfflineHandler:
-    def __init__(self, offline_storage_file: str = "offline_data.json"):
+    def __init__(
+        self,
+        offline_storage_file: str = "offline_data.db",
+        connectivity: Optional[ConnectivityMonitor] = None,
+        synced_retention_days: int = 7,
+        sync_chunk_size: int = 50,
+        sync_workers: int = 4,
+    ):
         offline_dir = os.path.dirname(offline_storage_file)
         if offline_dir:
             os.makedirs(offline_dir, exist_ok=True)
             
         self.offline_storage_file = offline_storage_file
-        self.offline_data = self._load_offline_data()
-
-    def _load_offline_data(self) -> List[Dict[str, Any]]:
-        try:
-            with open(self.offline_storage_file, "r", encoding="utf-8") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        self.connectivity = connectivity or ConnectivityMonitor()
+        self.synced_retention_days = synced_retention_days
+        self.sync_chunk_size = sync_chunk_size
+        self.sync_workers = sync_workers
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(offline_storage_file, check_same_thread=False)
+        self._init_db()
+        self._import_legacy_files(offline_dir or ".")
 
-    def _save_offline_data(self):
-        with open(self.offline_storage_file, "w", encoding="utf-8") as file:
-            json.dump(self.offline_data, file, indent=4, ensure_ascii=False) 
+    def _init_db(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS offline_attendance (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    created_at REAL NOT NULL,
+                    synced_at REAL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_offline_attendance_status ON offline_attendance (status, id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS imported_files (name TEXT PRIMARY KEY, imported_at REAL NOT NULL)"
+            )
 
-    def is_online(self) -> bool:
-        test_urls = ["http://www.google.com", "http://1.1.1.1", "http://api.openai.com"]
-        for url in test_urls:
+    def _import_legacy_files(self, offline_dir: str):
+        # data_<date>.json files written by the previous full-rewrite JSON store
+        for path in sorted(glob.glob(os.path.join(offline_dir, "data_*.json"))):
             try:
-                requests.get(url, timeout=5)
-                return True
-            except requests.ConnectionError:
+                with open(path, "r", encoding="utf-8") as file:
+                    records = json.load(file)
+            except (OSError, json.JSONDecodeError):
                 continue
-        return False  
 
-    def save_offline(self, data: Dict[str, Any]):
-        self.offline_data.append(data)
-        self._save_offline_data()
+            # the rows and the imported marker commit together, so a crash mid-import
+            # leaves either nothing or everything, never a partial copy to re-import
+            name = os.path.basename(path)
+            with self._lock, self._conn:
+                if self._conn.execute("SELECT 1 FROM imported_files WHERE name = ?", (name,)).fetchone():
+                    imported = False
+                else:
+                    now = time()
+                    self._conn.executemany(
+                        "INSERT INTO offline_attendance (payload, created_at) VALUES (?, ?)",
+                        [(json.dumps(data, ensure_ascii=False), now) for data in records],
+                    )
+                    self._conn.execute("INSERT INTO imported_files (name, imported_at) VALUES (?, ?)", (name, now))
+                    imported = True
+
+            os.replace(path, f"{path}.imported")
+            if imported:
+                logger.info(f"Imported {len(records)} offline records from {path}")
+
+    @property
+    def offline_data(self) -> List[Dict[str, Any]]:
+        return [data for _, data in self.pending_records()]
+
+    def pending_records(self, limit: Optional[int] = None, after_id: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        query = "SELECT id, payload FROM offline_attendance WHERE status = 'pending' AND id > ? ORDER BY id"
+        params = (after_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (after_id, limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [(record_id, json.loads(payload)) for record_id, payload in rows]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM offline_attendance WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def mark_synced(self, record_ids: List[int], status: str = "synced"):
+        if not record_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE offline_attendance SET status = ?, synced_at = ? WHERE id = ?",
+                [(status, time(), record_id) for record_id in record_ids],
+            )
+
+    def mark_rejected(self, record_ids: List[int]):
+        # kept, not deleted, so refused records can still be inspected
+        self.mark_synced(record_ids, status="rejected")
+
+    def compact(self):
+        cutoff = time() - self.synced_retention_days * 86400
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM offline_attendance WHERE status = 'synced' AND synced_at < ?", (cutoff,)
+                ).rowcount
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if deleted:
+            logger.info(f"Compacted {deleted} synced offline records.")
+
+    def is_online(self) -> bool:
+        return self.connectivity.is_online()
+
+    def report_post_failure(self) -> None:
+        # a post that failed because the server is unreachable flips the shared state right away,
+        # so the records behind it go straight offline instead of each waiting out its retries
+        if not self.connectivity.probe():
+            self.connectivity.mark_offline()
+
+    def save_offline(self, data: Dict[str, Any]) -> int:
+        with self._lock, self._conn:
+            record_id = self._conn.execute(
+                "INSERT INTO offline_attendance (payload, created_at) VALUES (?, ?)",
+                (json.dumps(data, ensure_ascii=False), time()),
+            ).lastrowid
         logger.info("Data saved offline.")
+        return record_id
 
-    def sync_offline_data(self, post_attendance_func: callable):
-        if self.is_online():
-            successful_syncs = [data for data in self.offline_data if post_attendance_func(data) is not None]
-            
-            if successful_syncs:
-                logger.info(f"Synced {len(successful_syncs)} records.")
-            
-            self.offline_data = [data for data in self.offline_data if data not in successful_syncs]
-            self._save_offline_data()
-            logger.info("Offline data synced.")
-        else:
+    def sync_offline_data(self, post_attendance_func: callable, bulk_post_func: Optional[callable] = None) -> int:
+        if not self.is_online():
             logger.warning("System is offline. Cannot sync data.")
+            return 0
+
+        if not self._sync_lock.acquire(blocking=False):
+            logger.info("Offline sync already in progress.")
+            return 0
+
+        try:
+            start = time()
+            synced, last_id = 0, 0
+
+            with ThreadPoolExecutor(max_workers=self.sync_workers) as executor:
+                while True:
+                    chunk = self.pending_records(self.sync_chunk_size, after_id=last_id)
+                    if not chunk:
+                        break
+                    last_id = chunk[-1][0]
+
+                    synced_ids, rejected_ids = None, []
+                    if bulk_post_func is not None:
+                        if bulk_post_func([data for _, data in chunk]) is not None:
+                            synced_ids = [record_id for record_id, _ in chunk]
+                        else:
+                            logger.warning("Bulk attendance upload failed. Falling back to per-record sync.")
+                            bulk_post_func = None
+
+                    if synced_ids is None:
+                        outcomes = list(zip(chunk, executor.map(lambda record: _sync_outcome(post_attendance_func, record[1]), chunk)))
+                        synced_ids = [record_id for (record_id, _), outcome in outcomes if outcome == "synced"]
+                        rejected_ids = [record_id for (record_id, _), outcome in outcomes if outcome == "rejected"]
+
+                    # checkpoint after every chunk so an interrupted sync resumes from here
+                    self.mark_synced(synced_ids)
+                    self.mark_rejected(rejected_ids)
+                    synced += len(synced_ids)
+                    OFFLINE_SYNCED.inc(len(synced_ids))
+                    if rejected_ids:
+                        logger.warning(f"Server rejected {len(rejected_ids)} offline records. They will not be retried.")
+
+                    # refused records don't block the rest of the backlog; a chunk with no answer at all means
+                    # the link is down again
+                    if not synced_ids and not rejected_ids:
+                        logger.warning("No records in chunk reached the server. Stopping sync for now.")
+                        break
+
+            elapsed = time() - start
+            if synced:
+                logger.info(
+                    f"Synced {synced} records in {elapsed:.1f}s "
+                    f"({synced / max(elapsed, 1e-6):.1f} records/s), {self.pending_count()} still pending."
+                )
+
+            self.compact()
+            logger.info("Offline data synced.")
+            return synced
+        finally:
+            self._sync_lock.release()
+
+
+def _sync_outcome(post_attendance_func: callable, data: Dict[str, Any]) -> str:
+    try:
+        return "synced" if post_attendance_func(data) is not None else "failed"
+    except RequestRejected as e:
+        logger.error(f"Offline record rejected: {str(e)}")
+        return "rejected"
+
+
+def _record_outcome(outcome: str) -> None:
+    metrics.counter("attendance_records_total", "Attendance records by delivery outcome", {"outcome": outcome}).inc()
 
 
 class AttendanceProcessor:
-    def __init__(self, offline_handler, post_attendance_func):
+    def __init__(self, offline_handler, post_attendance_func, max_attempts: int = 3, cooldown_seconds: float = 5.0):
         self.offline_handler = offline_handler
         self.post_attendance = post_attendance_func
-        self.sent_records_file = f"logs/attendance/records/sent_records_data_{datetime.now().date().isoformat()}.json"
+        self.max_attempts = max_attempts
+        self.cooldown_seconds = cooldown_seconds
+        records_dir = "logs/attendance/records"
+        today = datetime.now().date().isoformat()
+        self.sent_records_file = os.path.join(records_dir, f"sent_records_{today}.jsonl")
+        self.legacy_sent_records_file = os.path.join(records_dir, f"sent_records_data_{today}.json")
         
-        os.makedirs(os.path.dirname(self.sent_records_file), exist_ok=True)
+        os.makedirs(records_dir, exist_ok=True)
         
         self.sent_records = self._load_sent_records()
-        self.last_sent_time = 0
-        self.throttle_interval = 5  
+        self._journal = open(self.sent_records_file, "a", encoding="utf-8")
+        self._terminate_torn_line()
+        self._migrate_legacy_sent_records()
+        self._last_seen: Dict[Tuple, float] = {}
+        self._last_pruned = time()
+
+        self._records_lock = threading.Lock()
+        self._outbox = queue.Queue()
+        self._queued_keys = set()
+        self._worker = None
+        metrics.gauge("attendance_outbox_depth", "Attendance records waiting for delivery", func=self.pending)
+        metrics.gauge("offline_backlog", "Attendance records stored offline awaiting sync",
+                      func=self.offline_handler.pending_count)
 
     def _load_sent_records(self):
+        sent_records = set()
+
+        try:
+            with open(self.sent_records_file, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        sent_records.add(tuple(json.loads(line)))
+                    except json.JSONDecodeError:
+                        # torn final line from a crash mid-append
+                        continue
+        except FileNotFoundError:
+            pass
+
+        return sent_records
+
+    def _terminate_torn_line(self):
+        with open(self.sent_records_file, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) == b"\n":
+                return
+        self._journal.write("\n")
+        self._journal.flush()
+
+    def _migrate_legacy_sent_records(self):
+        # the old full-rewrite JSON file is folded into the journal once and then removed,
+        # so a later reset can't be undone by reloading it
         try:
-            with open(self.sent_records_file, "r") as file:
-                return set(tuple(record) for record in json.load(file))
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
+            with open(self.legacy_sent_records_file, "r") as file:
+                legacy_records = [tuple(record) for record in json.load(file)]
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            legacy_records = []
 
-    def _save_sent_records(self):
-        with open(self.sent_records_file, "w") as file:
-            json.dump(list(self.sent_records), file)
+        for record_key in legacy_records:
+            if record_key not in self.sent_records:
+                self.sent_records.add(record_key)
+                self._append_sent_record(record_key)
+        os.fsync(self._journal.fileno())
+        os.remove(self.legacy_sent_records_file)
+        logger.info(f"Migrated {len(legacy_records)} legacy sent records into {self.sent_records_file}")
+
+    def _prune_last_seen(self, current_time: float):
+        if current_time - self._last_pruned < self.cooldown_seconds:
+            return
+        self._last_pruned = current_time
+        self._last_seen = {
+            record_key: seen for record_key, seen in self._last_seen.items()
+            if current_time - seen < self.cooldown_seconds
+        }
+
+    def _append_sent_record(self, record_key):
+        self._journal.write(json.dumps(list(record_key), ensure_ascii=False) + "\n")
+        self._journal.flush()
 
     def postprocess(self, prediction: int, course_id: int, schedule_id: int, device_id: int) -> int:
         current_time = time()
+        record_key = (prediction, course_id, schedule_id)
 
-        if current_time - self.last_sent_time < self.throttle_interval:
-            logger.info("Throttling: Waiting to send data again.")
-            return prediction
+        with self._records_lock:
+            self._prune_last_seen(current_time)
+            if current_time - self._last_seen.get(record_key, 0) < self.cooldown_seconds:
+                logger.debug(f"Cooldown active for {record_key}. Skipping.")
+                return prediction
+            self._last_seen[record_key] = current_time
 
-        record_key = (prediction, course_id, schedule_id)
+            if record_key in self.sent_records:
+                logger.debug("Data already sent. Skipping.")
+                _record_outcome("duplicate")
+                return prediction
 
-        if record_key in self.sent_records:
-            logger.info("Data already sent. Skipping.")
-            return prediction
+            if record_key in self._queued_keys:
+                logger.debug("Data already queued. Skipping.")
+                _record_outcome("duplicate")
+                return prediction
+            self._queued_keys.add(record_key)
 
         attendance_data = {
             "schedule": schedule_id,
@@ -105,22 +349,92 @@ class AttendanceProcessor:
             "device": device_id,
         }
 
-        if self.offline_handler.is_online():
-            if self.post_attendance(attendance_data) is not None:
-                logger.info("Data sent to API successfully.")
-                self.sent_records.add(record_key)
-                self.last_sent_time = current_time
-                self._save_sent_records()
-            else:
-                logger.warning("Failed to send data to API. Saving offline.")
-                self.offline_handler.save_offline(attendance_data)  
-        else:
-            logger.warning("System is offline. Saving data locally.")
-            self.offline_handler.save_offline(attendance_data) 
+        self._ensure_worker()
+        self._outbox.put((record_key, attendance_data))
 
         return prediction
 
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_outbox, name="attendance-outbox", daemon=True)
+            self._worker.start()
+
+    def _run_outbox(self):
+        while True:
+            record_key, attendance_data = self._outbox.get()
+            try:
+                self._deliver(record_key, attendance_data)
+            except Exception as e:
+                logger.error(f"Failed to deliver attendance: {str(e)}. Saving offline.")
+                self.offline_handler.save_offline(attendance_data)
+                _record_outcome("offline")
+            finally:
+                with self._records_lock:
+                    self._queued_keys.discard(record_key)
+                self._outbox.task_done()
+
+    def _deliver(self, record_key, attendance_data):
+        for attempt in range(self.max_attempts):
+            if not self.offline_handler.is_online():
+                logger.warning("System is offline. Saving data locally.")
+                self.offline_handler.save_offline(attendance_data)
+                _record_outcome("offline")
+                return
+
+            with POST_SECONDS.time():
+                response = self.post_attendance(attendance_data)
+
+            if response is not None:
+                logger.info("Data sent to API successfully.")
+                with self._records_lock:
+                    self.sent_records.add(record_key)
+                    self._append_sent_record(record_key)
+                _record_outcome("sent")
+                return
+
+            logger.warning(f"Attendance post attempt {attempt + 1} failed.")
+            _record_outcome("retry")
+            self.offline_handler.report_post_failure()
+            if attempt < self.max_attempts - 1:
+                sleep(2 ** attempt)
+
+        logger.warning("Failed to send data to API. Saving offline.")
+        self.offline_handler.save_offline(attendance_data)
+        _record_outcome("offline")
+
+    def pending(self) -> int:
+        return self._outbox.unfinished_tasks
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        deadline = time() + timeout
+        while self._outbox.unfinished_tasks and time() < deadline:
+            sleep(0.05)
+
+        if not self._outbox.unfinished_tasks:
+            return True
+
+        # worker is stuck on the network; move whatever is still queued to the offline store
+        moved = 0
+        while True:
+            try:
+                record_key, attendance_data = self._outbox.get_nowait()
+            except queue.Empty:
+                break
+            self.offline_handler.save_offline(attendance_data)
+            _record_outcome("offline")
+            with self._records_lock:
+                self._queued_keys.discard(record_key)
+            self._outbox.task_done()
+            moved += 1
+
+        logger.warning(f"Outbox flush timed out. Moved {moved} queued records offline.")
+        return False
+
     def reset_sent_records(self):
-        self.sent_records.clear()
-        self._save_sent_records()
+        with self._records_lock:
+            self.sent_records.clear()
+            self._last_seen.clear()
+            self._journal.truncate(0)
+            if os.path.exists(self.legacy_sent_records_file):
+                os.remove(self.legacy_sent_records_file)
         logger.info("Reset sent_records for new course.")
\ No newline at end of file
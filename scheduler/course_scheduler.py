@@ -1,94 +1,402 @@
-from datetime import datetime
-from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, TYPE_CHECKING
+import glob
 import os
+import threading
+import time
 from api.client import APIClient
-from models.model import FaceRecognitionModel
+from api.connectivity import ConnectivityMonitor
+from models.embedding import EmbeddingGallery
 from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.preview import PreviewServer
+from config import Config
 from .attendance import OfflineHandler, AttendanceProcessor
+from .pipeline import RecognitionPipeline
+from .frame_source import frame_source_from_spec
+from .streams import StreamSpec, StreamContext, BatchInferenceWorker, parse_stream_specs
+from .model_cache import ModelCache, CachedModel
+from .manifest import ModelManifest
+from .timeline import ScheduleTimeline, TimelineSession
 
 import numpy as np
-import cv2
 import json
 
+if TYPE_CHECKING:
+    from models.model import FaceRecognitionModel
+    from models.motion import MotionGate
+    from models.tracker import FaceTracker, Box
+
 logger = get_logger(__name__,file_path="logs/scheduler.log")
 
+CAPTURE_SECONDS = metrics.histogram("capture_seconds", "Camera read latency per frame")
+FRAMES_CAPTURED = metrics.counter("frames_captured_total", "Frames read from the camera")
+FRAMES_SKIPPED = metrics.counter("frames_skipped_total", "Frames the motion gate kept from the detector")
+
 class CourseScheduler:
     def __init__(self, api_client: APIClient, device_id: str):
         self.api_client = api_client
         self.device_id = device_id
-        self.model_manager = FaceRecognitionModel()
-        self.current_model = None
+        self._model_manager = None
+        self._inference = None
+        self._vision_lock = threading.Lock()
         self.models_dir = "course_models"
-        self.label_map = None
-        self.offline_handler = OfflineHandler(f"logs/attendance/offline/data_{datetime.now().date().isoformat()}.json")
-        self.attendance_processor = AttendanceProcessor(self.offline_handler, self.api_client.post_attendance)
-        self.checked_students = set()
+        self.embedding_model = None
+        self.manifest = ModelManifest(os.path.join(self.models_dir, "manifest.json"))
+        self.model_cache = ModelCache(Config.MODEL_CACHE_SIZE, Config.MODEL_CACHE_MAX_MB * 1024 * 1024)
+        self.schedule_data = None
+        self.timeline = ScheduleTimeline(os.path.join(self.models_dir, "schedule_cache.json"))
+        self._timeline_changed = threading.Event()
+        self._sync_requested = threading.Event()
+        self._sync_worker: Optional[threading.Thread] = None
+        self._completed_sessions = set()
+        self._retry_at: Dict[Any, float] = {}
+        self._prefetched = set()
+        self._load_lock = threading.Lock()
+        self._sync_locks: Dict[int, threading.Lock] = {}
+        self._sync_locks_guard = threading.Lock()
+        self.connectivity = ConnectivityMonitor(
+            Config.BASE_URL,
+            interval=Config.CONNECTIVITY_CHECK_INTERVAL,
+            max_backoff=Config.CONNECTIVITY_MAX_BACKOFF,
+        )
+        self.offline_handler = OfflineHandler(
+            "logs/attendance/offline/offline_attendance.db",
+            self.connectivity,
+            sync_chunk_size=Config.SYNC_CHUNK_SIZE,
+            sync_workers=Config.SYNC_WORKERS,
+        )
+        self.connectivity.add_listener(self._on_connectivity_change)
+        self.attendance_processor = AttendanceProcessor(
+            self.offline_handler,
+            lambda data: self.api_client.post_attendance(data, attempts=1),
+            max_attempts=Config.MAX_RETRIES,
+            cooldown_seconds=Config.ATTENDANCE_COOLDOWN_SECONDS,
+        )
+        self.stream_specs = parse_stream_specs(Config.CAMERA_STREAMS) or [StreamSpec("camera")]
+        self.streams: List[StreamContext] = []
+        self.preview = PreviewServer(Config.PREVIEW_PORT, Config.PREVIEW_FPS, host=Config.PREVIEW_HOST) if Config.PREVIEW_PORT else None
+
+    def load_vision_stack(self) -> None:
+        # cv2, dlib and the detector models take seconds to import on a Pi, so they
+        # load on first use (or from a boot thread) instead of at module import
+        with self._vision_lock:
+            if self._model_manager is not None:
+                return
+
+            from models.model import FaceRecognitionModel
+
+            # crops wait in the detections queue and in the classify stage
+            self._model_manager = FaceRecognitionModel()
+            self._inference = BatchInferenceWorker(
+                lambda model, face_images: self._model_manager.predict_faces(face_images, model),
+                max_batch=Config.INFERENCE_MAX_BATCH,
+                max_wait=Config.INFERENCE_BATCH_WAIT_MS / 1000.0,
+            )
+
+    @property
+    def model_manager(self) -> "FaceRecognitionModel":
+        self.load_vision_stack()
+        return self._model_manager
+
+    @property
+    def inference(self) -> BatchInferenceWorker:
+        self.load_vision_stack()
+        return self._inference
+
+    def new_tracker(self) -> "FaceTracker":
+        from models.tracker import FaceTracker
+
+        return FaceTracker(
+            detect_interval=Config.TRACKER_DETECT_INTERVAL,
+            confirm_votes=Config.TRACKER_CONFIRM_VOTES,
+        )
+
+    def new_motion_gate(self) -> Optional["MotionGate"]:
+        if not Config.MOTION_GATING:
+            return None
+        from models.motion import MotionGate
+
+        return MotionGate(
+            width=Config.MOTION_WIDTH,
+            threshold=Config.MOTION_THRESHOLD,
+            hold_seconds=Config.MOTION_HOLD_SECONDS,
+            idle_fps=Config.MOTION_IDLE_FPS,
+        )
+
+    def sync_offline_attendance(self) -> int:
+        # no retry backoff per record: anything that fails stays pending for the next sync
+        return self.offline_handler.sync_offline_data(
+            lambda data: self.api_client.post_attendance(data, attempts=1, raise_rejected=True),
+            (lambda records: self.api_client.post_attendance_bulk(records, attempts=1)) if Config.ATTENDANCE_BULK_SYNC else None,
+        )
+
+    def _on_connectivity_change(self, online: bool) -> None:
+        # runs on the monitor thread: the sync itself happens on the sync worker so a slow
+        # upload never holds up the next connectivity check
+        if online:
+            logger.info("Connection restored. Syncing offline attendance...")
+            self.request_offline_sync()
+
+    def request_offline_sync(self) -> None:
+        self._sync_requested.set()
+        if self._sync_worker is None or not self._sync_worker.is_alive():
+            self._sync_worker = threading.Thread(target=self._run_offline_sync, name="offline-sync", daemon=True)
+            self._sync_worker.start()
+
+    def _run_offline_sync(self) -> None:
+        while True:
+            # reconnects that arrive while a sync runs collapse into one follow-up pass
+            self._sync_requested.wait()
+            self._sync_requested.clear()
+            try:
+                self.sync_offline_attendance()
+            except Exception as e:
+                logger.error(f"Offline attendance sync failed: {str(e)}")
 
     def get_all_schedule(self):
-        return self.api_client.get_schedule(self.device_id)
+        schedule_data = self.api_client.get_schedule(self.device_id)
+        if schedule_data is not None:
+            self.schedule_data = schedule_data
+            if self.timeline.update(schedule_data.get('results', [])):
+                self._timeline_changed.set()
+        return schedule_data
+
+    def start_schedule_refresher(self) -> None:
+        def refresh_loop():
+            while True:
+                time.sleep(Config.SCHEDULE_REFRESH_INTERVAL)
+                try:
+                    self.get_all_schedule()
+                except Exception as e:
+                    logger.error(f"Failed to refresh schedule: {str(e)}")
+
+        threading.Thread(target=refresh_loop, name="schedule-refresher", daemon=True).start()
+
+    def seconds_until_next_event(self) -> float:
+        now = datetime.now()
+        boundary = self.timeline.next_boundary()
+        wait = Config.SCHEDULE_REFRESH_INTERVAL
+        if boundary is not None:
+            wait = max(0.0, min((boundary - now).total_seconds(), wait))
+        # a slot that failed to start is retried every tick until it runs or ends
+        if self._pending_sessions(now):
+            wait = min(wait, Config.CHECK_INTERVAL)
+        return wait
+
+    def wait_for_next_event(self) -> None:
+        # woken early when a schedule refresh changes the timeline
+        if self._timeline_changed.wait(self.seconds_until_next_event()):
+            self._timeline_changed.clear()
     
+    def _pending_sessions(self, now: datetime) -> List[TimelineSession]:
+        return [session for session in self.timeline.active_sessions(now)
+                if (now.date(), session.schedule_id) not in self._completed_sessions]
+
     def check_and_update_model(self) -> None:
-        schedule_data = self.api_client.get_schedule(self.device_id)
-        if not schedule_data or 'results' not in schedule_data:
-            logger.error("Failed to get schedule data or invalid format")
-            return
-
-        current_day = datetime.now().strftime("%A").lower()
-        
-        # check each schedule in results
-        for schedule in schedule_data['results']:
-            if (schedule['day_of_week'] == current_day and 
-                self.is_course_time(schedule)):
-                course_id = schedule['course']
-
-                if self.load_course_model(course_id):
-                    print(schedule)
-                    self.run_face_recognition(end_time = schedule['end_time'], schedule_id = schedule['id'], course_id = course_id)
-                    logger.info(f"Loaded and running model for course {course_id}")
-                break
-        
-    def is_course_time(self, schedule_item: Dict) -> bool:
-        current_time = datetime.now().time()
-        start_time = datetime.strptime(schedule_item['start_time'], '%H:%M:%S').time()
-        end_time = datetime.strptime(schedule_item['end_time'], '%H:%M:%S').time()
-
-        return start_time <= current_time <= end_time
+        now = datetime.now()
+        if self._pending_sessions(now):
+            self._retry_at.clear()
+            self.run_face_recognition()
     
-    def load_course_model(self, course_id: int) -> bool:
-        model_path = os.path.join(self.models_dir, f"model_{course_id}.keras")
+    def course_model_path(self, course_id: int) -> str:
+        if Config.RECOGNITION_MODE == "embedding":
+            return os.path.join(self.models_dir, f"gallery_{course_id}.npy")
+        return os.path.join(self.models_dir, f"model_{course_id}.keras")
+
+    def local_model_version(self, course_id: int) -> Optional[int]:
+        version = self.manifest.local_version(course_id)
+        if version is not None:
+            return version
+
+        # models installed before the manifest existed only have a .version file
+        version_path = os.path.join(self.models_dir, f"model_{course_id}.version")
+        if not os.path.exists(version_path):
+            return None
+        try:
+            with open(version_path, "r") as f:
+                return int(f.read().strip())
+        except ValueError:
+            return None
+
+    def refresh_manifest(self) -> bool:
+        face_models = self.api_client.list_face_models()
+        if face_models is None:
+            logger.warning("Cannot list face models. Falling back to per-course version checks.")
+            return False
+        self.manifest.refresh(face_models)
+        return True
+
+    def remote_model_info(self, course_id: int) -> Optional[Dict]:
+        info = self.manifest.remote_info(course_id, max_age=Config.MANIFEST_MAX_AGE)
+        if info is None:
+            info = self.api_client.get_model_info(str(course_id))
+            if info is not None:
+                self.manifest.update_remote(course_id, info)
+        return info
+
+    def _adopt_legacy_versions(self, course_ids: List[int]) -> None:
+        legacy = {}
+        for course_id in course_ids:
+            model_path = self.course_model_path(course_id)
+            if self.manifest.local_version(course_id) is not None or not os.path.exists(model_path):
+                continue
+            version = self.local_model_version(course_id)
+            if version is not None:
+                legacy[course_id] = {"model_version": version, "checksum": None, "size": os.path.getsize(model_path)}
+        if legacy:
+            self.manifest.adopt_legacy(legacy)
+            logger.info(f"Moved {len(legacy)} legacy model versions into the manifest")
+
+    def courses_needing_download(self, course_ids: List[int]) -> List[int]:
+        self._adopt_legacy_versions(course_ids)
+        missing = [course_id for course_id in course_ids if not os.path.exists(self.course_model_path(course_id))]
+        return sorted(set(missing) | set(self.manifest.diff(course_ids)))
+
+    def _load_course_entry(self, course_id: int) -> Optional[CachedModel]:
+        model_path = self.course_model_path(course_id)
         label_map_path = os.path.join(self.models_dir, f"label_map_{course_id}.json")
 
         if not os.path.exists(model_path):
             logger.error(f"Model not found for course {course_id}")
+            return None
+
+        if not os.path.exists(label_map_path):
+            logger.error(f"Label map not found for course {course_id}")
+            return None
+
+        with open(label_map_path, 'r') as f:
+            label_map = json.load(f)
+
+        if Config.RECOGNITION_MODE == "embedding":
+            gallery = EmbeddingGallery.load(model_path, Config.EMBEDDING_MATCH_THRESHOLD)
+            if gallery is None:
+                return None
+            if self.embedding_model is None:
+                self.embedding_model = self.model_manager.open_model(Config.EMBEDDING_MODEL_PATH)
+            if self.embedding_model is None:
+                return None
+            return CachedModel(self.embedding_model, label_map, gallery.embeddings.nbytes, gallery)
+
+        model = self.model_manager.open_model(model_path)
+        if model is None:
+            return None
+        return CachedModel(model, label_map, os.path.getsize(model_path))
+
+    def _get_course_entry(self, course_id: int) -> Optional[CachedModel]:
+        version = self.local_model_version(course_id)
+
+        with self._load_lock:
+            entry = self.model_cache.get(course_id, version)
+            if entry is not None:
+                logger.info(f"Using cached model for course {course_id} (version {version})")
+                return entry
+
+            entry = self._load_course_entry(course_id)
+            if entry is not None:
+                self.model_cache.put(course_id, version, entry)
+            return entry
+
+    def sync_course_model(self, course_id: int) -> bool:
+        with self._sync_locks_guard:
+            lock = self._sync_locks.setdefault(course_id, threading.Lock())
+
+        with lock:
+            if not self.check_model_update(course_id):
+                return True
+            return self._download_course_model(course_id)
+
+    def _download_course_model(self, course_id: int) -> bool:
+        info = self.remote_model_info(course_id)
+        if not info or info.get("model_version") is None:
+            logger.error(f"No model version known for course {course_id}. Not downloading.")
             return False
 
-        self.current_model = self.model_manager.load_model(model_path)
+        model_path = self.course_model_path(course_id)
+        label_map_path = os.path.join(self.models_dir, f"label_map_{course_id}.json")
+        os.makedirs(self.models_dir, exist_ok=True)
 
-        if os.path.exists(label_map_path):
-            with open(label_map_path, 'r') as f:
-                self.label_map = json.load(f)
+        # stage both files first so a failed download never leaves a mismatched pair behind
+        staging_suffix = f".v{info.get('model_version')}.download"
+        staged_model, staged_label_map = f"{model_path}{staging_suffix}", f"{label_map_path}{staging_suffix}"
+        # partial files from versions the server has since replaced would never be resumed
+        for path in glob.glob(f"{glob.escape(model_path)}.v*.download*") + glob.glob(f"{glob.escape(label_map_path)}.v*.download*"):
+            if not path.startswith((staged_model, staged_label_map)):
+                os.remove(path)
+                logger.info(f"Removed stale staged download {path}")
+        if Config.RECOGNITION_MODE == "embedding":
+            model_success = self.api_client.download_gallery(str(course_id), staged_model, info.get("checksum"))
         else:
-            logger.error(f"Label map not found for course {course_id}")
+            model_success = self.api_client.download_model(str(course_id), staged_model, info.get("checksum"))
+        label_success = model_success and self.api_client.map_model(
+            str(course_id), staged_label_map, info.get("label_map_checksum")
+        )
+
+        if not (model_success and label_success):
+            logger.error(f"Failed to download model or label map for course {course_id}")
             return False
 
-        return self.current_model is not None
-    
+        os.replace(staged_label_map, label_map_path)
+        os.replace(staged_model, model_path)
+        self.manifest.record_install(course_id, info, os.path.getsize(model_path))
+
+        logger.info(f"Installed model version {info.get('model_version')} for course {course_id}")
+        return True
+
+    def prefetch_upcoming(self) -> None:
+        now = datetime.now()
+        lead_time = timedelta(seconds=Config.PREFETCH_LEAD_SECONDS)
+
+        for session in self.timeline.upcoming(lead_time, now):
+            key = (session.occurrence(now).date(), session.schedule_id)
+            if key in self._prefetched:
+                continue
+            self._prefetched.add(key)
+
+            threading.Thread(target=self._prefetch_course, args=(session.course_id,), daemon=True).start()
+
+    def _prefetch_course(self, course_id: int) -> None:
+        try:
+            start = time.perf_counter()
+            if not self.sync_course_model(course_id):
+                return
+
+            entry = self._get_course_entry(course_id)
+            if entry is None:
+                return
+
+            # the inference thread makes every model call, so warming up there can't run the
+            # (not thread-safe) interpreter alongside a stream that starts on this model meanwhile
+            width, height = self.model_manager.input_size
+            self.inference.start()
+            self.inference.submit(entry.model, np.zeros((Config.PREFETCH_WARMUP_BATCH, height, width, 3), dtype=np.uint8)).result()
+
+            logger.info(f"Prefetched model for course {course_id} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Failed to prefetch model for course {course_id}: {str(e)}")
+
+    def start_prefetcher(self) -> None:
+        def prefetch_loop():
+            while True:
+                self.prefetch_upcoming()
+                time.sleep(Config.CHECK_INTERVAL)
+
+        threading.Thread(target=prefetch_loop, name="prefetcher", daemon=True).start()
+
     def check_model_update(self, course_id: int) -> bool:
-        model_path = os.path.join(self.models_dir, f"model_{course_id}.keras")
-        version_path = os.path.join(self.models_dir, f"model_{course_id}.version")
+        model_path = self.course_model_path(course_id)
 
         if not os.path.exists(model_path):
             return True
 
-        latest_version = self.api_client.get_model_version(str(course_id))
+        remote_info = self.remote_model_info(course_id)
+        latest_version = remote_info.get("model_version") if remote_info else None
         if latest_version is None:
             logger.warning(f"Cannot fetch model version for course {course_id}. Skipping update check.")
             return False 
 
-        if os.path.exists(version_path):
-            with open(version_path, "r") as f:
-                current_version = int(f.read().strip())
-
+        current_version = self.local_model_version(course_id)
+        if current_version is not None:
             if current_version == latest_version:
                 logger.info(f"Model for course {course_id} is up-to-date (version {current_version}). Skipping download.")
                 return False  
@@ -97,57 +405,193 @@ class CourseScheduler:
         else:
             logger.info(f"No local version file for course {course_id}. Downloading new model.")
 
+        self.model_cache.invalidate(course_id)
         return True 
 
 
-    def run_face_recognition(self, end_time: str, schedule_id: int, course_id: int) -> None:
-        if self.current_model is None:
-            logger.warning("No model currently loaded")
-            return
+    def _predicted_labels(self, context: StreamContext, predictions: np.ndarray) -> List[str]:
+        if Config.RECOGNITION_MODE == "embedding":
+            indices, _ = context.gallery.match(predictions)
+            return [context.label_map[str(index)] if index >= 0 else "unknown" for index in indices]
+        return [context.label_map[str(index)] for index in np.argmax(predictions, axis=1)]
 
-        self.checked_students.clear()  # check if start new course
-        cap = cv2.VideoCapture(0)
+    def _track_faces(self, context: StreamContext, frame: Any) -> Tuple[Any, List[Tuple[int, "Box", Optional[str]]], List[int], np.ndarray]:
+        # an empty, still scene skips detection; live tracks keep every frame so they stay locked on
+        if context.gate is not None and not context.gate.should_process(frame, busy=bool(context.tracker.tracks)):
+            FRAMES_SKIPPED.inc()
+            return frame, [], [], self.model_manager.crop_faces(frame, [])
 
-        if not cap.isOpened():
-            logger.error("Cannot open camera.")
-            return
+        tracks = context.tracker.update(frame, self.model_manager.detect)
+        pending = context.tracker.unconfirmed(tracks)
+        boxes = [(track.track_id, track.box, track.label) for track in tracks]
+        face_images = self.model_manager.crop_faces(frame, [track.box for track in pending])
+        return frame, boxes, [track.track_id for track in pending], face_images
 
-        try:
-            while datetime.now().strftime('%H:%M:%S') < end_time:
-                ret, frame = cap.read()
-                if not ret:
-                    logger.error("Cannot read frame from camera.")
-                    break
+    def _classify_faces(self, context: StreamContext, item: Tuple[Any, list, List[int], np.ndarray]) -> Tuple[Any, list, List[int], Optional[np.ndarray]]:
+        frame, boxes, track_ids, face_images = item
+        if not len(face_images):
+            return frame, boxes, track_ids, None
+        # batched with the other streams' faces on the shared inference thread
+        return frame, boxes, track_ids, self.inference.submit(context.model, face_images).result()
 
-                result, predictions = self.model_manager.predict(frame)
+    def _report_predictions(self, context: StreamContext, item: Tuple[Any, list, List[int], Optional[np.ndarray]]) -> Any:
+        result, boxes, track_ids, predictions = item
+        labels = {track_id: label for track_id, _, label in boxes}
 
-                if predictions:
-                    pred_index = np.argmax(predictions[0])  
-                    predicted_label = self.label_map[str(pred_index)]
+        if predictions is not None:
+            for track_id, predicted_label in zip(track_ids, self._predicted_labels(context, predictions)):
+                labels[track_id] = predicted_label
 
-                    if predicted_label in self.checked_students:
-                        logger.info(f"Student {predicted_label} already checked in. Skipping...")
-                        continue
+                confirmed_label = context.tracker.resolve(track_id, predicted_label)
+                if confirmed_label is None or confirmed_label == "unknown":
+                    continue
 
-                    if predicted_label != "unknown":
-                        self.attendance_processor.postprocess(predicted_label, course_id, schedule_id, self.device_id)
-                        self.checked_students.add(predicted_label)  
+                if confirmed_label in context.checked_students:
+                    logger.debug(f"Student {confirmed_label} already checked in. Skipping...")
+                    continue
 
-                    cv2.putText(result, f'Prediction: {predicted_label}', (10, 70),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                else:
-                    cv2.putText(result, 'No face detected', (10, 70),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                self.attendance_processor.postprocess(confirmed_label, context.course_id, context.schedule_id, self.device_id)
+                context.checked_students.add(confirmed_label)
+
+        # headless devices only draw when a preview client is due a frame
+        publish_preview = context.preview and self.preview is not None and self.preview.wants_frame()
+        if Config.HEADLESS and not publish_preview:
+            return None
+
+        self._annotate(result, boxes, labels)
+        if publish_preview:
+            self.preview.publish(result)
+        return result
+
+    def _annotate(self, result: Any, boxes: list, labels: Dict[int, Optional[str]]) -> None:
+        import cv2
+
+        if boxes:
+            for track_id, (x1, y1, x2, y2), _ in boxes:
+                cv2.rectangle(result, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(result, str(labels.get(track_id) or '...'), (x1, max(y1 - 10, 20)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        else:
+            cv2.putText(result, 'No face detected', (10, 70),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+    def _start_stream(self, spec: StreamSpec, session: TimelineSession, entry: CachedModel) -> Optional[StreamContext]:
+        source = frame_source_from_spec(spec.source)
+        if not source.open():
+            logger.error(f"Cannot open frame source for stream {spec.name}.")
+            return None
+
+        context = StreamContext(
+            spec.name, source, session.schedule_id, session.course_id, session.end_time,
+            entry, self.new_tracker(), preview=not self.streams,
+        )
+        context.gate = self.new_motion_gate()
+
+        def capture():
+            with CAPTURE_SECONDS.time():
+                ret, frame = source.read()
+            FRAMES_CAPTURED.inc()
+            return ret, frame
+
+        context.pipeline = RecognitionPipeline(
+            capture=capture,
+            detect=lambda frame: self._track_faces(context, frame),
+            classify=lambda item: self._classify_faces(context, item),
+            report=lambda item: self._report_predictions(context, item),
+            queue_size=Config.PIPELINE_QUEUE_SIZE,
+        )
+        for stage in context.pipeline.stages:
+            labels = {"stream": spec.name, "stage": stage.name}
+            metrics.gauge("pipeline_queue_depth", "Items waiting for each pipeline stage", labels, func=stage.inbox.__len__)
+            metrics.gauge("pipeline_dropped", "Items dropped before each stage this session", labels,
+                          func=lambda queue=stage.inbox: queue.dropped)
+        if context.gate is not None:
+            metrics.gauge("motion_frames_skipped", "Frames skipped by the motion gate this session", {"stream": spec.name},
+                          func=lambda gate=context.gate: gate.skipped)
+
+        context.pipeline.start()
+        self.streams.append(context)
+        logger.info(f"Stream {spec.name} running course {session.course_id} (schedule {session.schedule_id})")
+        return context
+
+    def _start_sessions(self, now: datetime) -> None:
+        busy = {context.name for context in self.streams}
+        for session in self.timeline.active_sessions(now):
+            key = (now.date(), session.schedule_id)
+            if key in self._completed_sessions or time.monotonic() < self._retry_at.get(key, 0.0):
+                continue
+            # the slot only counts as done once a stream is actually running it; a busy camera or a
+            # model that isn't there yet is retried once per check interval until the slot ends
+            self._retry_at[key] = time.monotonic() + Config.CHECK_INTERVAL
+            specs = [spec for spec in self.stream_specs if spec.name not in busy and spec.serves(session.schedule_id)]
+            if not specs:
+                logger.warning(f"No free camera stream for schedule {session.schedule_id}")
+                continue
+
+            entry = self._get_course_entry(session.course_id)
+            if entry is None:
+                logger.warning(f"No model available for course {session.course_id}")
+                continue
+
+            for spec in specs:
+                context = self._start_stream(spec, session, entry)
+                if context is not None:
+                    context.session_key = key
+                    busy.add(spec.name)
+                    self._completed_sessions.add(key)
+
+    def _stop_stream(self, context: StreamContext) -> None:
+        context.pipeline.stop()
+        context.source.release()
+        self.streams.remove(context)
+        # a stream that dies or is closed before its slot ends is started again on a later pass
+        if datetime.now().strftime('%H:%M:%S') < context.end_time:
+            self._completed_sessions.discard(context.session_key)
+            logger.warning(f"Stream {context.name} stopped before {context.end_time}; it will be restarted.")
+        logger.info(f"Stream {context.name} pipeline stats: {context.pipeline.stats()}")
+        logger.info(f"Stream {context.name} tracker stats: {context.tracker.stats()}")
+        if context.gate is not None:
+            logger.info(f"Stream {context.name} motion gate stats: {context.gate.stats()}")
+
+    def run_face_recognition(self) -> None:
+        import cv2
+
+        self.inference.start()
+        ran = False
+
+        try:
+            while True:
+                now = datetime.now()
+                # expired streams go first so a back-to-back slot finds its camera free
+                for context in list(self.streams):
+                    if not context.pipeline.is_running() or now.strftime('%H:%M:%S') >= context.end_time:
+                        self._stop_stream(context)
+                self._start_sessions(now)
+
+                if not self.streams:
+                    break
+                ran = True
+
+                for context in list(self.streams):
+                    result = context.pipeline.get_output(timeout=0.5 / len(self.streams))
+                    if result is None or Config.HEADLESS:
+                        continue
+                    cv2.imshow(f"Live Camera Feed - {context.name}", result)
 
-                cv2.imshow('Live Camera Feed', result)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if not Config.HEADLESS and cv2.waitKey(1) & 0xFF == ord('q'):
                     break
 
         except Exception as e:
             logger.error(f"Error in face recognition loop: {str(e)}")
 
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            self.offline_handler.sync_offline_data(self.api_client.post_attendance)
-            logger.info("Face recognition completed.")
\ No newline at end of file
+            for context in list(self.streams):
+                self._stop_stream(context)
+            # a slot that couldn't start yet is retried every tick; only a real session pays for the teardown
+            if ran:
+                if not Config.HEADLESS:
+                    cv2.destroyAllWindows()
+                logger.info(f"Inference stats: {self.inference.stats()}")
+                self.attendance_processor.flush(Config.OUTBOX_FLUSH_TIMEOUT)
+                self.sync_offline_attendance()
+                logger.info("Face recognition completed.")
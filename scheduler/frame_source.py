@@ -0,0 +1,185 @@
+import socket
+import struct
+from typing import Any, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+ENCODING_RAW = 0
+ENCODING_JPEG = 1
+
+# encoding, height, width, channels, payload length -- followed by the payload
+HEADER = struct.Struct("!BHHBI")
+
+# a 4K BGR frame is ~25 MB; anything past this is a corrupt or hostile header
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class VideoCaptureSource:
+    def __init__(self, device: Union[int, str] = 0):
+        self.device = device
+        self._cap = None
+
+    def open(self) -> bool:
+        import cv2
+
+        self._cap = cv2.VideoCapture(self.device)
+        return self._cap.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self._cap.read()
+
+    def release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class NetworkSource:
+    # Raw payloads are received straight into a fresh frame array, so each frame is
+    # written exactly once and no later read can touch a frame a pipeline stage still holds.
+    def __init__(self, host: str, port: int, timeout: float = 5.0, reconnect_attempts: int = 3,
+                 max_frame_bytes: int = MAX_FRAME_BYTES):
+        self.host = host
+        self.port = port
+        self.max_frame_bytes = max_frame_bytes
+        self.timeout = timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.frames_received = 0
+        self.frames_corrupt = 0
+        self.bytes_received = 0
+        self._sock: Optional[socket.socket] = None
+        self._header = bytearray(HEADER.size)
+        # only JPEG payloads land here; imdecode returns a new array before the next read
+        self._encoded = bytearray()
+
+    def open(self) -> bool:
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            logger.info(f"Connected to frame stream at {self.host}:{self.port}")
+            return True
+        except OSError as e:
+            logger.error(f"Cannot connect to frame stream at {self.host}:{self.port}: {str(e)}")
+            self._sock = None
+            return False
+
+    def _recv_into(self, view: memoryview) -> bool:
+        while view:
+            received = self._sock.recv_into(view)
+            if not received:
+                return False
+            view = view[received:]
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        while True:
+            if not self._recv_into(memoryview(self._header)):
+                return None
+            encoding, height, width, channels, length = HEADER.unpack(self._header)
+
+            # the header is checked before anything is allocated from it
+            frame_bytes = height * width * channels
+            if channels not in (1, 3, 4) or not 0 < frame_bytes <= self.max_frame_bytes:
+                raise ValueError(f"Bad frame header: {height}x{width}x{channels}")
+
+            if encoding == ENCODING_RAW:
+                if length != frame_bytes:
+                    raise ValueError(f"Raw frame length {length} does not match {height}x{width}x{channels}")
+                shape = (height, width, channels) if channels > 1 else (height, width)
+                frame = np.empty(shape, dtype=np.uint8)
+                if not self._recv_into(memoryview(frame).cast("B")):
+                    return None
+            elif encoding == ENCODING_JPEG:
+                import cv2
+
+                if length > frame_bytes:
+                    raise ValueError(f"JPEG payload of {length} bytes is larger than the raw frame")
+                if len(self._encoded) < length:
+                    self._encoded = bytearray(length)
+                if not self._recv_into(memoryview(self._encoded)[:length]):
+                    return None
+                frame = cv2.imdecode(np.frombuffer(self._encoded, dtype=np.uint8, count=length), cv2.IMREAD_COLOR)
+            else:
+                raise ValueError(f"Unknown frame encoding: {encoding}")
+
+            self.bytes_received += HEADER.size + length
+            if frame is None:
+                # the stream is still framed correctly, so one bad image is skipped, not reconnected over
+                self.frames_corrupt += 1
+                logger.warning("Skipping undecodable frame from stream")
+                continue
+            self.frames_received += 1
+            return frame
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        for attempt in range(self.reconnect_attempts + 1):
+            if self._sock is not None:
+                try:
+                    frame = self._read_frame()
+                    if frame is not None:
+                        return True, frame
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Frame stream error: {str(e)}")
+
+            self.release()
+            if attempt < self.reconnect_attempts:
+                logger.info(f"Reconnecting to frame stream (attempt {attempt + 1})")
+                self.open()
+        return False, None
+
+    def release(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def send_frame(sock: socket.socket, frame: np.ndarray, jpeg_quality: Optional[int] = None) -> None:
+    height, width = frame.shape[:2]
+    channels = frame.shape[2] if frame.ndim == 3 else 1
+
+    if jpeg_quality is not None:
+        import cv2
+
+        ok, payload = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        encoding = ENCODING_JPEG
+    else:
+        payload = np.ascontiguousarray(frame)
+        encoding = ENCODING_RAW
+
+    data = memoryview(payload).cast("B")
+    sock.sendall(HEADER.pack(encoding, height, width, channels, data.nbytes))
+    sock.sendall(data)
+
+
+def _network_source(address: str) -> NetworkSource:
+    host, _, port = address.rpartition(":")
+    return NetworkSource(host, int(port))
+
+
+def _capture_source(device: str) -> VideoCaptureSource:
+    return VideoCaptureSource(int(device) if device.isdigit() else device)
+
+
+def create_frame_source(name: Optional[str] = None) -> Any:
+    name = name or Config.FRAME_SOURCE
+    if name == "camera":
+        return _capture_source(Config.CAMERA_DEVICE)
+    if name == "network":
+        return _network_source(Config.FRAME_SOURCE_ADDRESS)
+    raise ValueError(f"Unknown frame source: {name}")
+
+
+def frame_source_from_spec(spec: Optional[str]) -> Any:
+    # tcp://host:port for a frame sender, anything else goes to cv2.VideoCapture
+    if not spec:
+        return create_frame_source()
+    if spec.startswith("tcp://"):
+        return _network_source(spec[len("tcp://"):])
+    return _capture_source(spec)
@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import threading
+from time import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+
+class ModelManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.local: Dict[str, Dict[str, Any]] = {}
+        self.remote: Dict[str, Dict[str, Any]] = {}
+        self.last_refreshed = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self.local = data.get("local", {})
+        self.remote = data.get("remote", {})
+        self.last_refreshed = data.get("last_refreshed", 0.0)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # installs from the download pool save concurrently: the inner dicts are only walked
+        # under the lock, and each writer gets its own tmp file
+        with self._lock:
+            data = {"local": self.local, "remote": self.remote, "last_refreshed": self.last_refreshed}
+            fd, tmp_path = tempfile.mkstemp(prefix=".manifest.", suffix=".tmp", dir=directory or ".")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def refresh(self, face_models: List[Dict[str, Any]]) -> None:
+        now = time()
+        latest: Dict[str, Dict[str, Any]] = {}
+        for info in face_models:
+            course_id = info.get("course")
+            if course_id is None:
+                continue
+            # the listing can hold several versions of a course; only the newest counts
+            current = latest.get(str(course_id))
+            if current is None or self._version_key(info) > self._version_key(current):
+                latest[str(course_id)] = info
+
+        with self._lock:
+            for course_id, info in latest.items():
+                self.remote[course_id] = self._remote_entry(info, now)
+            self.last_refreshed = now
+        self.save()
+        logger.info(f"Manifest refreshed with {len(face_models)} face models")
+
+    def update_remote(self, course_id: int, info: Dict[str, Any]) -> None:
+        with self._lock:
+            self.remote[str(course_id)] = self._remote_entry(info, time())
+        self.save()
+
+    @staticmethod
+    def _version_key(info: Dict[str, Any]) -> int:
+        version = info.get("model_version")
+        return version if isinstance(version, int) else -1
+
+    @staticmethod
+    def _remote_entry(info: Dict[str, Any], checked_at: float) -> Dict[str, Any]:
+        return {
+            "model_version": info.get("model_version"),
+            "checksum": info.get("checksum"),
+            "label_map_checksum": info.get("label_map_checksum"),
+            "size": info.get("size"),
+            "last_checked": checked_at,
+        }
+
+    def remote_info(self, course_id: int, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            info = self.remote.get(str(course_id))
+        if info is None:
+            return None
+        if max_age is not None and time() - info.get("last_checked", 0) > max_age:
+            return None
+        return info
+
+    def local_version(self, course_id: int) -> Optional[int]:
+        with self._lock:
+            entry = self.local.get(str(course_id))
+        return entry.get("model_version") if entry else None
+
+    def record_install(self, course_id: int, info: Dict[str, Any], size: int) -> None:
+        with self._lock:
+            self.local[str(course_id)] = {
+                "model_version": info.get("model_version"),
+                "checksum": info.get("checksum"),
+                "size": size,
+                "installed_at": time(),
+            }
+        self.save()
+
+    def adopt_legacy(self, versions: Dict[int, Dict[str, Any]]) -> None:
+        # an existing manifest record always wins over a version read from disk
+        with self._lock:
+            for course_id, entry in versions.items():
+                self.local.setdefault(str(course_id), {**entry, "installed_at": time()})
+        self.save()
+
+    def diff(self, course_ids: Iterable[int]) -> List[int]:
+        with self._lock:
+            return [
+                course_id for course_id in course_ids
+                if str(course_id) not in self.local
+                or (str(course_id) in self.remote
+                    and self.remote[str(course_id)]["model_version"] != self.local[str(course_id)]["model_version"])
+            ]
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+CacheKey = Tuple[int, Optional[int]]
+
+
+class CachedModel:
+    def __init__(self, model: Any, label_map: Dict[str, str], size_bytes: int, gallery: Any = None):
+        self.model = model
+        self.label_map = label_map
+        self.size_bytes = size_bytes
+        self.gallery = gallery
+
+
+class ModelCache:
+    def __init__(self, max_entries: int = 3, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, CachedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def get(self, course_id: int, version: Optional[int]) -> Optional[CachedModel]:
+        key = (course_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, course_id: int, version: Optional[int], entry: CachedModel) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == course_id and key != (course_id, version)]:
+                del self._entries[key]
+            self._entries[(course_id, version)] = entry
+            self._entries.move_to_end((course_id, version))
+            self._evict()
+
+    def invalidate(self, course_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == course_id]:
+                del self._entries[key]
+                logger.info(f"Invalidated cached model for course {course_id} (version {key[1]})")
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            (course_id, version), _ = self._entries.popitem(last=False)
+            logger.info(f"Evicted cached model for course {course_id} (version {version})")
+
+    def __contains__(self, key: CacheKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,175 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item: Any, timeout: Optional[float] = None, force: bool = False) -> bool:
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class BlockingQueue(DropOldestQueue):
+    # Never drops: a full queue makes the producer wait, and the backpressure
+    # ends at the next drop-oldest queue upstream. force goes past the bound.
+    def put(self, item: Any, timeout: Optional[float] = None, force: bool = False) -> bool:
+        with self._cond:
+            if len(self._items) >= self.maxsize and not force:
+                self._cond.wait(timeout)
+            if len(self._items) >= self.maxsize and not force:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+        return True
+
+
+class PipelineStage:
+    def __init__(self, name: str, func: Callable[[Any], Any], inbox: DropOldestQueue, outbox: DropOldestQueue):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = 0
+        self.errors = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "dropped": self.inbox.dropped,
+            "queued": len(self.inbox),
+        }
+
+
+class RecognitionPipeline:
+    def __init__(
+        self,
+        capture: Callable[[], Tuple[bool, Any]],
+        detect: Callable[[Any], Any],
+        classify: Callable[[Any], Any],
+        report: Callable[[Any], Any],
+        queue_size: int = 2,
+    ):
+        self.capture = capture
+        self.frames_captured = 0
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # stale frames and detections can be dropped when a stage falls behind, but a
+        # classified face carries attendance, so nothing between classify and report is lost
+        self.frames = DropOldestQueue(queue_size)
+        self.detections = DropOldestQueue(queue_size)
+        self.results = BlockingQueue(queue_size)
+        self.output = DropOldestQueue(queue_size)
+
+        self.stages = [
+            PipelineStage("detect", detect, self.frames, self.detections),
+            PipelineStage("classify", classify, self.detections, self.results),
+            PipelineStage("report", report, self.results, self.output),
+        ]
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._stage_loop, args=(stage,), name=stage.name, daemon=True)
+            for stage in self.stages
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        # classified faces still waiting for the report stage are reported before the pipeline goes away
+        report = self.stages[-1]
+        while True:
+            item = report.inbox.get(timeout=0)
+            if item is None:
+                break
+            self._run_stage(report, item)
+
+    def is_running(self) -> bool:
+        return not self._stop_event.is_set()
+
+    def get_output(self, timeout: Optional[float] = None) -> Optional[Any]:
+        return self.output.get(timeout)
+
+    def _capture_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                ret, frame = self.capture()
+            except Exception as e:
+                # a dead capture thread must stop the pipeline, or the stream looks alive until end_time
+                logger.error(f"Error in capture stage: {str(e)}")
+                self._stop_event.set()
+                break
+            if not ret:
+                logger.error("Cannot read frame from source.")
+                self._stop_event.set()
+                break
+            self.frames_captured += 1
+            self.frames.put(frame)
+
+    def _stage_loop(self, stage: PipelineStage) -> None:
+        while not self._stop_event.is_set():
+            item = stage.inbox.get(timeout=0.1)
+            if item is None:
+                continue
+            result = self._run_stage(stage, item)
+            if result is None:
+                continue
+            while not stage.outbox.put(result, timeout=0.1):
+                if self._stop_event.is_set():
+                    # the consumer is stopping too; stop() drains what is left
+                    stage.outbox.put(result, force=True)
+                    break
+
+    def _run_stage(self, stage: PipelineStage, item: Any) -> Optional[Any]:
+        try:
+            result = stage.func(item)
+            stage.processed += 1
+            return result
+        except Exception as e:
+            stage.errors += 1
+            logger.error(f"Error in {stage.name} stage: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"capture": {"processed": self.frames_captured}}
+        for stage in self.stages:
+            stats[stage.name] = stage.stats()
+        stats["output"] = {"dropped": self.output.dropped, "queued": len(self.output)}
+        return stats
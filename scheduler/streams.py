@@ -0,0 +1,128 @@
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+from .model_cache import CachedModel
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+_BINDING = re.compile(r"\d+(\|\d+)*")
+
+
+class StreamSpec:
+    def __init__(self, name: str, source: Optional[str] = None, schedule_ids: Optional[Set[int]] = None):
+        self.name = name
+        self.source = source
+        self.schedule_ids = schedule_ids
+
+    def serves(self, schedule_id: int) -> bool:
+        return self.schedule_ids is None or schedule_id in self.schedule_ids
+
+
+def parse_stream_specs(value: str) -> List[StreamSpec]:
+    # "entrance=0,side=tcp://10.0.0.7:9999@14|15" -- an @ suffix binds the stream to schedule ids
+    specs = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, source = item.partition("=")
+        schedule_ids = None
+        head, _, tail = source.rpartition("@")
+        if head and _BINDING.fullmatch(tail):
+            source, schedule_ids = head, {int(schedule_id) for schedule_id in tail.split("|")}
+        specs.append(StreamSpec(name.strip(), source.strip(), schedule_ids))
+    return specs
+
+
+class StreamContext:
+    def __init__(self, name: str, source: Any, schedule_id: int, course_id: int, end_time: str,
+                 entry: CachedModel, tracker: Any, preview: bool = False):
+        self.name = name
+        self.source = source
+        self.schedule_id = schedule_id
+        self.course_id = course_id
+        self.end_time = end_time
+        self.model = entry.model
+        self.label_map = entry.label_map
+        self.gallery = entry.gallery
+        self.tracker = tracker
+        self.gate = None
+        self.session_key = None
+        self.preview = preview
+        self.checked_students: Set[str] = set()
+        self.pipeline = None
+
+
+class BatchInferenceWorker:
+    def __init__(self, predict: Callable[[Any, List[np.ndarray]], np.ndarray], max_batch: int = 16, max_wait: float = 0.0):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.faces = 0
+        self._requests: "queue.Queue[Tuple[Any, List[np.ndarray], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, model: Any, face_images: np.ndarray) -> Future:
+        future = Future()
+        self._requests.put((model, face_images, future))
+        return future
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> List[Tuple[Any, List[np.ndarray], Future]]:
+        requests = [self._requests.get()]
+        faces = len(requests[0][1])
+        deadline = time.perf_counter() + self.max_wait
+
+        # whatever other streams queued while the last batch ran joins this one
+        while faces < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            faces += len(request[1])
+        return requests
+
+    def _run(self) -> None:
+        while True:
+            groups: Dict[int, List[Tuple[Any, List[np.ndarray], Future]]] = {}
+            for request in self._collect():
+                groups.setdefault(id(request[0]), []).append(request)
+
+            for requests in groups.values():
+                model = requests[0][0]
+                # each request owns its crop array, so a lone one goes to the model as-is; merged ones are copied once
+                face_images = requests[0][1] if len(requests) == 1 else [face for _, faces, _ in requests for face in faces]
+                try:
+                    predictions = self.predict(model, face_images)
+                except Exception as e:
+                    for _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+
+                self.batches += 1
+                self.faces += len(face_images)
+                offset = 0
+                for _, faces, future in requests:
+                    future.set_result(predictions[offset:offset + len(faces)])
+                    offset += len(faces)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "faces": self.faces,
+            "mean_batch": round(self.faces / self.batches, 2) if self.batches else 0.0,
+            "queued": self._requests.qsize(),
+        }
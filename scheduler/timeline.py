@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/scheduler.log")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def _seconds(value: str) -> int:
+    hours, minutes, seconds = (int(part) for part in value.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+class TimelineSession:
+    def __init__(self, entry: Dict[str, Any]):
+        self.entry = entry
+        self.schedule_id = entry['id']
+        self.course_id = entry['course']
+        self.weekday = WEEKDAYS.index(entry['day_of_week'].lower())
+        self.start = _seconds(entry['start_time'])
+        self.end = _seconds(entry['end_time'])
+        self.end_time = entry['end_time']
+
+    def occurrence(self, now: datetime) -> datetime:
+        days_ahead = (self.weekday - now.weekday()) % 7
+        return datetime.combine(now.date(), datetime.min.time()) + timedelta(days=days_ahead)
+
+    def is_active(self, now: datetime) -> bool:
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        return now.weekday() == self.weekday and self.start <= seconds < self.end
+
+
+class ScheduleTimeline:
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self.sessions: List[TimelineSession] = []
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self._entries = {entry['id']: entry for entry in entries}
+        self._compile()
+        logger.info(f"Loaded {len(self.sessions)} cached schedule sessions from {self.cache_path}")
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._entries.values()), f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _compile(self) -> None:
+        sessions = []
+        for entry in self._entries.values():
+            try:
+                sessions.append(TimelineSession(entry))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping invalid schedule entry {entry.get('id')}: {str(e)}")
+        self.sessions = sorted(sessions, key=lambda session: (session.weekday, session.start))
+
+    def update(self, entries: List[Dict[str, Any]]) -> bool:
+        incoming = {entry['id']: entry for entry in entries if 'id' in entry}
+
+        with self._lock:
+            added = incoming.keys() - self._entries.keys()
+            removed = self._entries.keys() - incoming.keys()
+            changed = {key for key in incoming.keys() & self._entries.keys() if incoming[key] != self._entries[key]}
+            if not (added or removed or changed):
+                return False
+
+            self._entries = incoming
+            self._compile()
+            self._save_cache()
+
+        logger.info(f"Schedule timeline updated: {len(added)} added, {len(removed)} removed, {len(changed)} changed")
+        return True
+
+    def active_sessions(self, now: Optional[datetime] = None) -> List[TimelineSession]:
+        now = now or datetime.now()
+        return [session for session in self.sessions if session.is_active(now)]
+
+    def upcoming(self, within: timedelta, now: Optional[datetime] = None) -> List[TimelineSession]:
+        now = now or datetime.now()
+        upcoming = []
+        for session in self.sessions:
+            start = session.occurrence(now) + timedelta(seconds=session.start)
+            if now <= start <= now + within:
+                upcoming.append(session)
+        return upcoming
+
+    def next_boundary(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        now = now or datetime.now()
+        boundaries = []
+        for session in self.sessions:
+            day = session.occurrence(now)
+            for offset in (session.start, session.end):
+                boundary = day + timedelta(seconds=offset)
+                if boundary <= now:
+                    boundary += timedelta(days=7)
+                boundaries.append(boundary)
+        return min(boundaries) if boundaries else None
@@ -1,32 +1,17 @@
 import cv2
 import dlib
-import socket
 import numpy as np
-import pickle
-import struct
 from imutils import face_utils
+from scheduler.frame_source import NetworkSource
 
-def create_client_socket():
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client_socket.connect(('192.168.0.107', 9999))
-    return client_socket
+def create_client_source():
+    client_source = NetworkSource('192.168.0.107', 9999)
+    client_source.open()
+    return client_source
 
-def receive_frame(client_socket):
-    data = b""
-    payload_size = struct.calcsize("L")
-    
-    while len(data) < payload_size:
-        data += client_socket.recv(4096)
-    
-    packed_msg_size = data[:payload_size]
-    data = data[payload_size:]
-    msg_size = struct.unpack("L", packed_msg_size)[0]
-    
-    while len(data) < msg_size:
-        data += client_socket.recv(4096)
-    
-    frame_data = data[:msg_size]
-    frame = pickle.loads(frame_data)
+def receive_frame(client_source):
+    # length-prefixed raw/JPEG frames, see scheduler.frame_source.send_frame
+    ret, frame = client_source.read()
     return frame
 
 def main():
@@ -37,7 +22,7 @@ def main():
     
     cap = cv2.VideoCapture(0)
 
-    # client_socket = create_client_socket()
+    # client_source = create_client_source()
     
     # FPS calculation
     fps = 0
@@ -46,7 +31,7 @@ def main():
     while True:
         ret, frame = cap.read()
         # Receive frame from stream
-        # frame = receive_frame(client_socket)
+        # frame = receive_frame(client_source)
         
         # Create copies for each detector
         frame_opencv = frame.copy()
@@ -100,7 +85,7 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
     
-    # client_socket.close()
+    # client_source.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
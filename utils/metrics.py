@@ -0,0 +1,234 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/app.log")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: Labels):
+        yield f"{name}{_format_labels(labels)}", self.value
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, func: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.func = func
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def read(self) -> float:
+        if self.func is None:
+            return self.value
+        try:
+            return float(self.func())
+        except Exception:
+            return float("nan")
+
+    def samples(self, name: str, labels: Labels):
+        yield f"{name}{_format_labels(labels)}", self.read()
+
+    def snapshot(self) -> float:
+        return self.read()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name: str, labels: Labels):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{name}_bucket{_format_labels(labels, ('le', le))}", cumulative
+        yield f"{name}_sum{_format_labels(labels)}", total
+        yield f"{name}_count{_format_labels(labels)}", count
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "buckets": dict(zip([repr(bound) for bound in self.buckets] + ["+Inf"], self.counts)),
+            }
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "fra"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Dict[Labels, Any]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._snapshot_stop = threading.Event()
+
+    def _get(self, name: str, help_text: str, labels: Optional[Dict[str, Any]], factory: Callable[[], Any]):
+        name = f"{self.prefix}_{name}"
+        key = tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+        with self._lock:
+            family = self._metrics.setdefault(name, {})
+            self._help.setdefault(name, help_text)
+            metric = family.get(key)
+            if metric is None:
+                metric = family[key] = factory()
+            return metric
+
+    def counter(self, name: str, help_text: str = "", labels: Optional[Dict[str, Any]] = None) -> Counter:
+        return self._get(name, help_text, labels, Counter)
+
+    def histogram(self, name: str, help_text: str = "", labels: Optional[Dict[str, Any]] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(name, help_text, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, help_text: str = "", labels: Optional[Dict[str, Any]] = None,
+              func: Optional[Callable[[], float]] = None) -> Gauge:
+        gauge = self._get(name, help_text, labels, lambda: Gauge(func))
+        if func is not None:
+            # re-registering rebinds the callback, e.g. to a new session's pipeline
+            gauge.func = func
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            families = [(name, self._help[name], dict(family)) for name, family in sorted(self._metrics.items())]
+
+        lines = []
+        for name, help_text, family in families:
+            kind = next(iter(family.values())).kind
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in family.items():
+                for sample, value in metric.samples(name, labels):
+                    lines.append(f"{sample} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            families = {name: dict(family) for name, family in self._metrics.items()}
+
+        snapshot: Dict[str, Any] = {"timestamp": time.time()}
+        for name, family in sorted(families.items()):
+            for labels, metric in family.items():
+                snapshot[f"{name}{_format_labels(labels)}"] = metric.snapshot()
+        return snapshot
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_server(self, port: int, host: str = "0.0.0.0") -> None:
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Metrics endpoint listening on {host}:{port}/metrics")
+
+    def start_snapshots(self, path: str, interval: float) -> None:
+        def snapshot_loop():
+            while not self._snapshot_stop.wait(interval):
+                try:
+                    self.save(path)
+                except OSError as e:
+                    logger.error(f"Failed to write metrics snapshot: {str(e)}")
+
+        self._snapshot_stop.clear()
+        threading.Thread(target=snapshot_loop, name="metrics-snapshot", daemon=True).start()
+        logger.info(f"Writing metrics snapshots to {path} every {interval}s")
+
+    def stop(self) -> None:
+        self._snapshot_stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,113 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__, file_path="logs/app.log")
+
+BOUNDARY = "frame"
+
+
+class PreviewServer:
+    def __init__(self, port: int, fps: float = 2.0, host: str = "127.0.0.1", quality: int = 70):
+        self.port = port
+        self.host = host
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.quality = quality
+        self.clients = 0
+        self.frames_encoded = 0
+        self._jpeg: Optional[bytes] = None
+        self._last_encoded = 0.0
+        self._cond = threading.Condition()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def wants_frame(self) -> bool:
+        return self.clients > 0 and time.monotonic() - self._last_encoded >= self.interval
+
+    def publish(self, frame: Any) -> None:
+        import cv2
+
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self._cond:
+            self._jpeg = buffer.tobytes()
+            self._last_encoded = time.monotonic()
+            self.frames_encoded += 1
+            self._cond.notify_all()
+
+    def _next_frame(self, previous: Optional[bytes], timeout: float) -> Optional[bytes]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._jpeg is not None and self._jpeg is not previous, timeout)
+            return self._jpeg if self._jpeg is not previous else None
+
+    def _add_client(self, delta: int) -> None:
+        with self._cond:
+            self.clients += delta
+
+    def start(self) -> None:
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/snapshot"):
+                    self._snapshot()
+                elif self.path in ("/", "/stream", "/stream.mjpg"):
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _snapshot(self):
+                preview._add_client(1)
+                try:
+                    jpeg = preview._next_frame(None, timeout=5.0)
+                finally:
+                    preview._add_client(-1)
+
+                if jpeg is None:
+                    self.send_error(503, "No frame available")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(jpeg)))
+                self.end_headers()
+                self.wfile.write(jpeg)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+
+                preview._add_client(1)
+                jpeg = None
+                try:
+                    while True:
+                        jpeg = preview._next_frame(jpeg, timeout=5.0) or jpeg
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    preview._add_client(-1)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="preview", daemon=True).start()
+        logger.info(f"Preview server listening on {self.host}:{self.port}")
+        if self.host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning(f"Unauthenticated camera preview is reachable from the network on {self.host}")
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
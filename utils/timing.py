@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class StartupTimer:
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time.time()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            with self._lock:
+                self.phases[name] = {
+                    "start_s": round(start - self.started_at, 3),
+                    "duration_s": round(end - start, 3),
+                }
+
+    def run(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self.phase(name):
+            return func(*args, **kwargs)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"phases": dict(self.phases), "ready_s": round(time.time() - self.started_at, 3)}
+
+    def save(self, path: str) -> Dict[str, Any]:
+        report = self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report